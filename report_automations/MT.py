@@ -1,8 +1,26 @@
 import pandas as pd
 import numpy as np
 import openpyxl
+from openpyxl.cell.cell import Cell
 from openpyxl.utils import get_column_letter
 
+# Per-row Excel formulas; {row} is replaced with the Excel row number
+GENDER_FORMULA = '=IF(LEFT(D{row},1)="2",_xlfn.XLOOKUP(B1,BusinessGender!A:A,BusinessGender!C:C,"No Data"),IF(LEFT(C{row},3)="Mr.","Male",IF(LEFT(C{row},3)="Mr ","Male",IF(LEFT(C{row},3)="Rev","Male",IF(LEFT(C{row},4)="Miss","Female",IF(LEFT(C{row},3)="Ms.","Female",IF(LEFT(C{row},4)="Mrs.","Female"))))))'
+TOP50_FORMULA = '=IFNA(VLOOKUP(D{row},\'Top50\'!A:E,5,0),"Normal")'
+
+
+def build_row_formulas(template, excel_rows):
+    """
+    Build one formula string per row by concatenating the template pieces
+    around a Series of row-number strings (vectorised string concat).
+    """
+    pieces = template.split('{row}')
+    formulas = pieces[0] + excel_rows + pieces[1]
+    for piece in pieces[2:]:
+        formulas = formulas + excel_rows + piece
+    return formulas
+
+
 def unmerge_row1_and_save(file_path):
     """
     Opens an Excel file, unmerges all merged cells in row 1, 
@@ -34,10 +52,17 @@ def unmerge_row1_and_save(file_path):
         ws.unmerge_cells(str(merged_cell))
         
         # Optional: Fill all previously merged cells with the same value
-        # Comment out the loop below if you don't want to fill all cells
+        # Comment out the loop below if you don't want to fill all cells.
+        # Empty merges are left empty (as Excel does) and the top-left cell
+        # already holds the value, so only the remaining cells are written
+        # straight into the sheet's cell store.
+        if value is None:
+            continue
         for row in range(merged_cell.min_row, merged_cell.max_row + 1):
             for col in range(merged_cell.min_col, merged_cell.max_col + 1):
-                ws.cell(row, col).value = value
+                if row == merged_cell.min_row and col == merged_cell.min_col:
+                    continue
+                ws._cells[(row, col)] = Cell(ws, row=row, column=col, value=value)
     
     # Save the workbook to the same location
     wb.save(output_file_path)
@@ -52,38 +77,45 @@ def create_marginal_loans_df(unutilized_file_path, df_district=None, combined_df
     unmerge_row1_and_save(unutilized_file_path)
     unutilized_df = pd.read_excel(temp, sheet_name='Unutilized-MAR 2025')
     print(unutilized_df.columns.tolist())
-    margin_trading_df = pd.DataFrame()
 
-    margin_trading_df['Name of the Client'] = unutilized_df['Name of the Client']
-    margin_trading_df['ICAM code'] = unutilized_df['ICAM code']
-    margin_trading_df['Interest Rate NOV'] = unutilized_df['Intrest Rate ']
-    margin_trading_df['Market Value of Portfolio'] = unutilized_df['Market Value of Portfolio']
-    margin_trading_df['(ICAM) Debtor'] = unutilized_df['  (ICAM) D/C']
-    margin_trading_df['50% of Portfolio'] = margin_trading_df['Market Value of Portfolio'] * 0.5
-    margin_trading_df['Limit'] = unutilized_df.iloc[:, 8]
-    margin_trading_df['Liability'] = unutilized_df['Liability']
-    margin_trading_df['Corporate / Individual'] = unutilized_df['Corporate / Individual']
-    margin_trading_df['Repayment Cycle'] = 'Other'
-    margin_trading_df['Provision Category'] = 'Performing'
-    margin_trading_df['Forbone Loans (Yes/No)'] = 'No'
-    margin_trading_df['CBSL Sector'] = 'Financial Services'
-    
     # Fix for district mapping
-    contract_to_district = dict(zip(df_district["CLM_CODE"], df_district["DISTRICT"]))
-    margin_trading_df['CustomerDistrict(ClientMain)'] = margin_trading_df['ICAM code'].map(contract_to_district)
-    
+    contract_to_district = df_district.set_index("CLM_CODE")["DISTRICT"]
+    contract_to_district = contract_to_district[~contract_to_district.index.duplicated(keep='last')]
+
     # Fix for Micro/Small/Medium mapping - handle duplicates
-    # Option 1: Drop duplicates, keeping the first occurrence
-    combined_df_unique = combined_df.drop_duplicates(subset=['Client Code'], keep='first')
-    contract_to_ct_micro = dict(zip(combined_df_unique["Client Code"], combined_df_unique["Micro/Small/Medium"]))
-    margin_trading_df['Micro/Small/Medium'] = margin_trading_df['ICAM code'].map(contract_to_ct_micro)
-    
+    # Option 1: Keep the first value per Client Code, as an indexed lookup Series
+    contract_to_ct_micro = combined_df.groupby('Client Code', sort=False)['Micro/Small/Medium'].first()
+
     # Alternative Option 2: If you want to see which codes are duplicated
     # duplicates = combined_df[combined_df.duplicated(subset=['Client Code'], keep=False)]
     # print("Duplicate Client Codes:")
     # print(duplicates[['Client Code', 'Micro/Small/Medium']].sort_values('Client Code'))
 
-    margin_trading_df['Gender'] = [f'=IF(LEFT(D{i + 2},1)="2",_xlfn.XLOOKUP(B1,BusinessGender!A:A,BusinessGender!C:C,"No Data"),IF(LEFT(C{i + 2},3)="Mr.","Male",IF(LEFT(C{i + 2},3)="Mr ","Male",IF(LEFT(C{i + 2},3)="Rev","Male",IF(LEFT(C{i + 2},4)="Miss","Female",IF(LEFT(C{i + 2},3)="Ms.","Female",IF(LEFT(C{i + 2},4)="Mrs.","Female"))))))' for i in range(len(margin_trading_df))]
-    margin_trading_df['TOP50'] = [f'=IFNA(VLOOKUP(D{i + 2},\'Top50\'!A:E,5,0),"Normal")' for i in range(len(margin_trading_df))]
+    # Build the output frame in one shot from its columns
+    icam_code = unutilized_df['ICAM code']
+    margin_trading_df = pd.DataFrame({
+        'Name of the Client': unutilized_df['Name of the Client'],
+        'ICAM code': icam_code,
+        'Interest Rate NOV': unutilized_df['Intrest Rate '],
+        'Market Value of Portfolio': unutilized_df['Market Value of Portfolio'],
+        '(ICAM) Debtor': unutilized_df['  (ICAM) D/C'],
+        '50% of Portfolio': unutilized_df['Market Value of Portfolio'] * 0.5,
+        'Limit': unutilized_df.iloc[:, 8],
+        'Liability': unutilized_df['Liability'],
+        'Corporate / Individual': unutilized_df['Corporate / Individual'],
+        'Repayment Cycle': 'Other',
+        'Provision Category': 'Performing',
+        'Forbone Loans (Yes/No)': 'No',
+        'CBSL Sector': 'Financial Services',
+        'CustomerDistrict(ClientMain)': icam_code.map(contract_to_district),
+        'Micro/Small/Medium': icam_code.map(contract_to_ct_micro),
+    })
+
+    # Excel row numbers (data starts on row 2) as strings, shared by both formula columns
+    excel_rows = pd.Series(np.arange(2, len(margin_trading_df) + 2), index=margin_trading_df.index).astype(str)
+    margin_trading_df = margin_trading_df.assign(
+        Gender=build_row_formulas(GENDER_FORMULA, excel_rows),
+        TOP50=build_row_formulas(TOP50_FORMULA, excel_rows),
+    )
 
     return margin_trading_df
\ No newline at end of file
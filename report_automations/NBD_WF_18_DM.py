@@ -8,6 +8,34 @@ from openpyxl import Workbook
 from openpyxl.utils import get_column_letter
 from datetime import datetime, timedelta
 
+# Date formats accepted when normalising FDBaseNew_UserBranch date cells
+_DATE_FORMATS = (
+    "%d/%m/%Y",      # 18/09/2025
+    "%m/%d/%Y",      # 09/18/2025
+    "%Y-%m-%d",      # 2025-09-18
+    "%d-%m-%Y",      # 18-09-2025
+    "%Y/%m/%d",      # 2025/09/18
+    "%d.%m.%Y",      # 18.09.2025
+    "%d %m %Y",      # 18 09 2025
+    "%d/%m/%y",      # 18/09/25
+    "%m/%d/%y",      # 09/18/25
+    "%y/%m/%d",      # 25/09/18
+)
+
+# Subset of the above used when converting Portfolio dates to Excel serials
+_SERIAL_DATE_FORMATS = (
+    "%d/%m/%Y",      # 18/09/2025
+    "%m/%d/%Y",      # 09/18/2025
+    "%Y-%m-%d",      # 2025-09-18
+    "%d-%m-%Y",      # 18-09-2025
+    "%Y/%m/%d",      # 2025/09/18
+    "%d/%m/%y",      # 18/09/25
+    "%m/%d/%y",      # 09/18/25
+)
+
+# Excel's date system: serial 1 = 1900-01-01 (with the 1900 leap-year bug)
+_EXCEL_EPOCH = datetime(1899, 12, 30)
+
 # ------------------------------------------------------------
 # STEP 1 – Find and rename NBD-WF-18-DM Deposit Liability file
 # ------------------------------------------------------------
@@ -266,20 +294,7 @@ def parse_and_format_date(date_val, output_format="%d/%m/%Y"):
         return date_val
     
     # Try multiple date formats
-    date_formats = [
-        "%d/%m/%Y",      # 18/09/2025
-        "%m/%d/%Y",      # 09/18/2025
-        "%Y-%m-%d",      # 2025-09-18
-        "%d-%m-%Y",      # 18-09-2025
-        "%Y/%m/%d",      # 2025/09/18
-        "%d.%m.%Y",      # 18.09.2025
-        "%d %m %Y",      # 18 09 2025
-        "%d/%m/%y",      # 18/09/25
-        "%m/%d/%y",      # 09/18/25
-        "%y/%m/%d",      # 25/09/18
-    ]
-    
-    for fmt in date_formats:
+    for fmt in _DATE_FORMATS:
         try:
             dt = datetime.strptime(date_str, fmt)
             return dt.strftime(output_format)
@@ -360,8 +375,7 @@ def convert_date_string_to_excel_serial(date_str):
     
     # If it's already a datetime object
     if isinstance(date_str, datetime):
-        excel_epoch = datetime(1899, 12, 30)
-        delta = date_str - excel_epoch
+        delta = date_str - _EXCEL_EPOCH
         return delta.days
     
     # If it's already a number, return it
@@ -369,23 +383,13 @@ def convert_date_string_to_excel_serial(date_str):
         return date_str
     
     # Parse the date string
-    date_formats = [
-        "%d/%m/%Y",      # 18/09/2025
-        "%m/%d/%Y",      # 09/18/2025
-        "%Y-%m-%d",      # 2025-09-18
-        "%d-%m-%Y",      # 18-09-2025
-        "%Y/%m/%d",      # 2025/09/18
-        "%d/%m/%y",      # 18/09/25
-        "%m/%d/%y",      # 09/18/25
-    ]
-    
-    for fmt in date_formats:
+    date_str_clean = str(date_str).strip()
+    for fmt in _SERIAL_DATE_FORMATS:
         try:
-            dt = datetime.strptime(str(date_str).strip(), fmt)
+            dt = datetime.strptime(date_str_clean, fmt)
             # Convert to Excel serial number
             # Excel's date system: 1 = January 1, 1900
-            excel_epoch = datetime(1899, 12, 30)
-            delta = dt - excel_epoch
+            delta = dt - _EXCEL_EPOCH
             return delta.days
         except ValueError:
             continue
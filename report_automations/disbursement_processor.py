@@ -15,23 +15,21 @@ def get_disbursement_df(mainDF, NetportfolioDF):
     - disbursementDF: Filtered dataframe with disbursement data from last 3 months
     """
 
-    # Create a dictionary mapping CONTRACT_NO to ACTIVATION_DATE from NetportfolioDF
-    activation_date_mapping = dict(zip(
-        NetportfolioDF['CONTRACT_NO'],
-        NetportfolioDF['ACTIVATION_DATE']
-    ))
+    # Create a CONTRACT_NO -> ACTIVATION_DATE lookup Series from NetportfolioDF
+    # (last occurrence wins for duplicated contracts, as with a dict)
+    activation_date_mapping = NetportfolioDF.set_index('CONTRACT_NO')['ACTIVATION_DATE']
+    activation_date_mapping = activation_date_mapping[~activation_date_mapping.index.duplicated(keep='last')]
 
     # Map ACTIVATION_DATE to mainDF based on Contract No
     mainDF['ACTIVATION_DATE'] = mainDF['CONTRACT NO'].map(activation_date_mapping)
 
-    # Drop rows with NaN ACTIVATION_DATE values
-    mainDF = mainDF.dropna(subset=['ACTIVATION_DATE'])
-
-    # Convert ACTIVATION_DATE to datetime, coercing errors to NaT
-    mainDF['ACTIVATION_DATE'] = pd.to_datetime(mainDF['ACTIVATION_DATE'], errors='coerce')
-
-    # Drop any rows where conversion failed (resulted in NaT)
-    mainDF = mainDF.dropna(subset=['ACTIVATION_DATE'])
+    # Convert ACTIVATION_DATE to datetime, coercing errors to NaT (missing dates map to NaT too).
+    # Rows without a valid date are excluded by the period filter below, so mainDF itself
+    # is never filtered or copied.
+    activation_dates = mainDF['ACTIVATION_DATE']
+    if not pd.api.types.is_datetime64_any_dtype(activation_dates):
+        activation_dates = pd.to_datetime(activation_dates, errors='coerce')
+    valid_dates = activation_dates.dropna()
 
     # Calculate date range for last 3 months excluding current month
     current_date = datetime.now()
@@ -48,23 +46,18 @@ def get_disbursement_df(mainDF, NetportfolioDF):
 
     # Debug: Print date range and sample dates
     print(f"Filtering date range: {start_date.date()} to {end_date.date()}")
-    print(f"Total records before filtering: {len(mainDF)}")
-    if len(mainDF) > 0:
-        print(f"Sample ACTIVATION_DATE values: {mainDF['ACTIVATION_DATE'].head(10).tolist()}")
-        print(f"Min date: {mainDF['ACTIVATION_DATE'].min()}, Max date: {mainDF['ACTIVATION_DATE'].max()}")
-
-    # Filter mainDF for last 3 months excluding current month
-    disbursementDF = mainDF[
-        (mainDF['ACTIVATION_DATE'] >= start_date) &
-        (mainDF['ACTIVATION_DATE'] <= end_date)
-    ].copy()
+    print(f"Total records before filtering: {len(valid_dates)}")
+    if len(valid_dates) > 0:
+        print(f"Sample ACTIVATION_DATE values: {valid_dates.head(10).tolist()}")
+        print(f"Min date: {valid_dates.min()}, Max date: {valid_dates.max()}")
 
-    print(f"Total records after filtering: {len(disbursementDF)}")
+    # Filter mainDF for last 3 months excluding current month (NaT never matches)
+    in_period = activation_dates.between(start_date, end_date, inclusive='both')
 
-    # Create Month column with full month name
-    disbursementDF['Month'] = disbursementDF['ACTIVATION_DATE'].dt.strftime('%B')
+    print(f"Total records after filtering: {in_period.sum()}")
 
-    # Extract required columns
+    # Extract required columns, with a Month column holding the full month name.
+    # Only the extracted columns are taken from mainDF, so no full-frame copy is made.
     columns_to_extract = [
         'CLIENT NO',
         'CONTRACT NO',
@@ -78,6 +71,8 @@ def get_disbursement_df(mainDF, NetportfolioDF):
         'Month'
     ]
 
-    disbursementDF = disbursementDF[columns_to_extract]
+    disbursementDF = mainDF.loc[in_period, columns_to_extract[:-1]].assign(
+        Month=activation_dates[in_period].dt.strftime('%B').to_numpy()
+    )
 
     return disbursementDF
\ No newline at end of file
@@ -2,40 +2,76 @@ import pandas as pd
 import os
 from openpyxl import load_workbook
 from openpyxl.utils import get_column_letter
+from openpyxl.writer.excel import ExcelWriter as WorkbookWriter
 import re
+from datetime import datetime, timezone
+from zipfile import ZipFile, ZIP_DEFLATED
 
 
-def unmerge_cells(file_path):
+def save_workbook_fast(wb, file_path, compresslevel=1):
     """
-    Unmerge all cells in the Excel file and fill them with the merged cell's value.
+    Save the workbook like wb.save(), but with a lower deflate compression level.
+    Level 1 compresses several times faster than zipfile's default for a slightly
+    larger file.
 
     Args:
-    - file_path: Path to the Excel file
+    - wb: openpyxl Workbook to save
+    - file_path: Destination .xlsx path
+    - compresslevel: zlib compression level (1 = fastest, 9 = smallest)
     """
-    wb = load_workbook(file_path)
+    wb.properties.modified = datetime.now(timezone.utc).replace(tzinfo=None)
+    archive = ZipFile(file_path, 'w', ZIP_DEFLATED, allowZip64=True, compresslevel=compresslevel)
+    WorkbookWriter(wb, archive).save()
 
-    for sheet in wb.worksheets:
-        # Get all merged cell ranges
-        merged_cells = list(sheet.merged_cells.ranges)
 
-        # Unmerge and fill each range
-        for merged_range in merged_cells:
-            # Get the value from the top-left cell
-            min_col, min_row, max_col, max_row = merged_range.bounds
-            top_left_value = sheet.cell(min_row, min_col).value
+def read_unmerged_sheet(file_path, sheet_name=None, skiprows=0):
+    """
+    Read a sheet of the Excel file into a DataFrame with every merged range filled
+    with the merged cell's value. The workbook is loaded once and never written
+    back, so the source report is left untouched.
 
-            # Unmerge the cells
-            sheet.unmerge_cells(str(merged_range))
+    Args:
+    - file_path: Path to the Excel file
+    - sheet_name: Sheet to read (defaults to the first sheet, as pd.read_excel does)
+    - skiprows: Number of rows to skip before the header row
 
-            # Fill all cells in the range with the value
-            for row in range(min_row, max_row + 1):
-                for col in range(min_col, max_col + 1):
-                    sheet.cell(row, col).value = top_left_value
+    Returns:
+    - DataFrame with the first non-empty row after skiprows as its header
+    """
+    wb = load_workbook(file_path, data_only=True, keep_links=False)
+    sheet = wb[sheet_name] if sheet_name is not None else wb.worksheets[0]
 
-    # Save the workbook
-    wb.save(file_path)
+    rows = [list(row) for row in sheet.iter_rows(values_only=True)]
+    merged_bounds = [merged_range.bounds for merged_range in sheet.merged_cells.ranges]
     wb.close()
 
+    # Fill each merged range with the value from its top-left cell
+    for min_col, min_row, max_col, max_row in merged_bounds:
+        top_left_value = rows[min_row - 1][min_col - 1]
+        if top_left_value is None:
+            continue
+        for row in rows[min_row - 1:max_row]:
+            row[min_col - 1:max_col] = [top_left_value] * (max_col - min_col + 1)
+
+    # Skip blank rows as pd.read_excel does, then split off the header row
+    body = [row for row in rows[skiprows:] if any(value is not None for value in row)]
+    if not body:
+        return pd.DataFrame()
+    # Name the header cells as pandas does: blanks become "Unnamed: i", repeats get ".n"
+    # (a header merged across several columns repeats its name in each of them)
+    header = []
+    seen = {}
+    for i, name in enumerate(body[0]):
+        name = f"Unnamed: {i}" if name is None else name
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        header.append(name)
+
+    return pd.DataFrame(body[1:], columns=header)
+
 
 def consolidate_mt_reports():
     """
@@ -108,17 +144,15 @@ def consolidate_mt_reports():
 
     # Read all three reports
     dfs = []
+    loaded_dates = []
     for i, file_path in enumerate(report_files):
         if not os.path.exists(file_path):
             print(f"Warning: File not found - {file_path}")
             continue
 
-        # Unmerge cells before reading
-        print(f"Unmerging cells in {file_path}...")
-        unmerge_cells(file_path)
-
-        # Read Excel file and skip first 7 columns
-        df = pd.read_excel(file_path,skiprows=7)
+        # Read Excel file with merged cells filled in, skipping the first 7 rows
+        print(f"Reading {file_path} with merged cells filled...")
+        df = read_unmerged_sheet(file_path, skiprows=7)
 
         # Display available columns for debugging
         if i == 0:
@@ -127,30 +161,67 @@ def consolidate_mt_reports():
         # Select relevant columns (MT No., Client Name, Actual Lending)
         # Adjust column names if they differ in your files
         df_filtered = df[['MT No.', 'Client Name', 'Actual Lending(Rs.)']].copy()
-        df_filtered.columns = ['MT No.', 'Client Name', f'Actual Lending {report_dates[i]}']
+        df_filtered.columns = ['MT No.', 'Client Name', 'Actual Lending']
+        df_filtered['Date'] = report_dates[i]
+
+        # Drop blank/total rows without a key so each report has one row per MT entry
+        df_filtered = df_filtered.dropna(subset=['MT No.', 'Client Name'])
 
         dfs.append(df_filtered)
+        loaded_dates.append(report_dates[i])
 
     if len(dfs) == 0:
         print("Error: No files were successfully loaded")
         return pd.DataFrame()
 
-    # Merge all dataframes on MT No. and Client Name
-    consolidated_df = dfs[0].reset_index(drop=True)
-
-    for i in range(1, len(dfs)):
-        consolidated_df = consolidated_df.merge(
-            dfs[i],
-            on=['MT No.', 'Client Name'],
-            how='outer'
-        ).reset_index(drop=True)
+    # Stack the reports into one long frame (one block per report date)
+    reports_df = pd.concat(dfs, ignore_index=True)
+
+    # Factorize the (MT No., Client Name) keys of the reports and the opening balance
+    # once, so the reshape and merge below work on a single integer key column
+    key_columns = ['MT No.', 'Client Name']
+    all_keys = pd.concat([reports_df[key_columns], opening_balance_df[key_columns]], ignore_index=True)
+    key_ids = all_keys.groupby(key_columns, sort=False).ngroup().to_numpy()
+    unique_keys = all_keys.drop_duplicates().reset_index(drop=True)  # row position == key_id
+
+    reports_df = reports_df.drop(columns=key_columns).assign(key_id=key_ids[:len(reports_df)])
+    coded_opening_balance_df = opening_balance_df.drop(columns=key_columns).assign(key_id=key_ids[len(reports_df):])
+
+    # A report can list the same MT entry twice (e.g. a merged value repeated down several
+    # rows). Keep the last row of each and report the others, so pivot and the m:1 merge
+    # below get unique keys instead of failing on bad input
+    duplicated = reports_df.duplicated(subset=['key_id', 'Date'], keep='last')
+    if duplicated.any():
+        print(f"Warning: {duplicated.sum()} duplicated MT entries in the reports, keeping the last of each:")
+        print(unique_keys.iloc[reports_df.loc[duplicated, 'key_id']]
+              .assign(Date=reports_df.loc[duplicated, 'Date'].to_numpy()).to_string(index=False))
+        reports_df = reports_df[~duplicated]
+
+    duplicated = coded_opening_balance_df.duplicated(subset='key_id', keep='last')
+    if duplicated.any():
+        print(f"Warning: {duplicated.sum()} duplicated MT entries in the opening balance, keeping the last of each:")
+        print(unique_keys.iloc[coded_opening_balance_df.loc[duplicated, 'key_id']].to_string(index=False))
+        coded_opening_balance_df = coded_opening_balance_df[~duplicated]
+
+    # One row per MT entry with one Actual Lending column per report, in chronological order
+    consolidated_df = reports_df.pivot(index='key_id', columns='Date', values='Actual Lending')
+    consolidated_df = consolidated_df.reindex(columns=loaded_dates)
+    consolidated_df.columns = [f'Actual Lending {date}' for date in consolidated_df.columns]
+    consolidated_df = consolidated_df.reset_index()
 
     # Merge opening balance as the 3rd column (after MT No. and Client Name)
     consolidated_df = consolidated_df.merge(
-        opening_balance_df,
-        on=['MT No.', 'Client Name'],
-        how='left'
-    ).reset_index(drop=True)
+        coded_opening_balance_df,
+        on='key_id',
+        how='left',
+        validate='m:1'
+    )
+
+    # Restore the MT No. and Client Name columns from the factorized keys
+    consolidated_df = pd.concat(
+        [unique_keys.iloc[consolidated_df['key_id']].reset_index(drop=True), consolidated_df.drop(columns='key_id')],
+        axis=1
+    )
 
     # Reorder columns to place Column 2 and Opening Balance after Client Name
     cols = ['MT No.', 'Client Name', 'Gender', 'Opening Balance'] + [col for col in consolidated_df.columns if col not in ['MT No.', 'Client Name', 'Column 2', 'Opening Balance', 'Gender']]
@@ -186,7 +257,6 @@ def consolidate_mt_reports():
 
     # Generate filename with last month's name
     from datetime import datetime, timedelta
-    import shutil
 
     # Get last month's name and year
     today = datetime.today()
@@ -202,15 +272,19 @@ def consolidate_mt_reports():
     new_filename = f"{workbook_prefix} - {last_month_name}.xlsx"
     mt_output_file = os.path.join(output_dir, new_filename)
 
-    # Copy original file to new filename if it doesn't exist or if we're updating
-    if mt_output_file != mt_jun_2025_file:
-        shutil.copy2(mt_jun_2025_file, mt_output_file)
-        print(f"Created new workbook: {mt_output_file}")
+    # Load the opening balance workbook once; every sheet update below works on this
+    # in-memory copy and the result is saved to the new filename a single time
+    wb = load_workbook(mt_jun_2025_file)
 
-    # Write consolidated_df to the workbook file, Dis sheet, starting from A1
+    # Write consolidated_df to the workbook, Dis sheet, starting from A1
     print(f"\nWriting consolidated data to {mt_output_file}, sheet 'Dis'...")
-    with pd.ExcelWriter(mt_output_file, engine='openpyxl', mode='a', if_sheet_exists='overlay') as writer:
-        consolidated_df.to_excel(writer, sheet_name='Dis', startrow=0, startcol=0, index=False)
+    dis_sheet = wb['Dis'] if 'Dis' in wb.sheetnames else wb.create_sheet('Dis')
+    dis_rows = [tuple(consolidated_df.columns)] + list(
+        consolidated_df.astype(object).where(consolidated_df.notna(), None).itertuples(index=False, name=None)
+    )
+    for row, row_values in enumerate(dis_rows, start=1):
+        for col, cell_value in enumerate(row_values, start=1):
+            dis_sheet.cell(row=row, column=col).value = cell_value
     print(f"Data written successfully to 'Dis' sheet starting from cell A1")
 
     # Create gender summary table
@@ -223,62 +297,67 @@ def consolidate_mt_reports():
     print(f"Gender summary table:")
     print(gender_summary)
 
-    # Copy values only from Dis sheet A1:C1000 to Disbursement sheet starting at A3
-    print(f"\nCopying values from 'Dis' sheet (A1:C1000) to 'Disbursement' sheet (A3)...")
-    wb = load_workbook(mt_output_file)
+    # Copy the first three columns (MT No., Client Name, Gender) of the data just
+    # written to 'Dis' into the Disbursement sheet starting at A3
+    print(f"\nCopying values from 'Dis' sheet (A1:C{len(dis_rows)}) to 'Disbursement' sheet (A3)...")
 
     # Check if sheets exist
-    if 'Dis' not in wb.sheetnames:
-        print("Warning: 'Dis' sheet not found")
-    elif 'Disbursement' not in wb.sheetnames:
+    if 'Disbursement' not in wb.sheetnames:
         print("Warning: 'Disbursement' sheet not found")
     else:
-        dis_sheet = wb['Dis']
         disbursement_sheet = wb['Disbursement']
 
-        # Copy values only from A1:C1000 in Dis sheet to A3:C1002 in Disbursement sheet
-        for row in range(1, 1001):  # Rows 1 to 1000 in Dis sheet
-            for col in range(1, 4):  # Columns A, B, C (1, 2, 3)
-                cell_value = dis_sheet.cell(row=row, column=col).value
-                disbursement_sheet.cell(row=row+2, column=col).value = cell_value
+        copy_rows = [row_values[:3] for row_values in dis_rows]
+        for row, row_values in enumerate(copy_rows, start=3):
+            for col, cell_value in enumerate(row_values, start=1):
+                disbursement_sheet.cell(row=row, column=col).value = cell_value
 
-        print(f"Values copied successfully from 'Dis' A1:C1000 to 'Disbursement' A3:C1002")
+        # Clear any rows left over from the previous period below the copied block
+        copy_end_row = 2 + len(copy_rows)
+        for row in disbursement_sheet.iter_rows(min_row=copy_end_row + 1, max_col=3):
+            for cell in row:
+                if cell.value is not None:
+                    cell.value = None
 
-        
-        # Find the last row with data in column A of Disbursement sheet
-        last_row = 3  # Start from row 3 (where data starts)
-        for row in range(3, disbursement_sheet.max_row + 1):
-            if disbursement_sheet.cell(row=row, column=1).value is not None:
-                last_row = row
-            else:
-                break
+        print(f"Values copied successfully from 'Dis' A1:C{len(copy_rows)} to 'Disbursement' A3:C{copy_end_row}")
+
+
+        # The last row with data in column A is the end of the block just copied
+        # (every row has an MT No., so column A has no gaps)
+        last_row = copy_end_row
 
         print(f"\nCopying formulas from D10, E10, F10, G10 to end of data (row {last_row})...")
 
         # Get formulas from row 10, columns D, E, F, G (4, 5, 6, 7)
         formula_columns = [4, 5, 6, 7]  # D, E, F, G
+        col_letters = {col: get_column_letter(col) for col in formula_columns}
         source_row = 10
 
         print(f"Source formulas from row {source_row}:")
         for col in formula_columns:
             cell = disbursement_sheet.cell(row=source_row, column=col)
             if cell.value:
-                print(f"  Column {get_column_letter(col)}{source_row}: {cell.value}")
+                print(f"  Column {col_letters[col]}{source_row}: {cell.value}")
 
         # Copy formulas to all rows from 11 to last_row
         from openpyxl.formula.translate import Translator
 
+        # Tokenize each source formula once and reuse the translator for every row
+        translators = {}
+        for col in formula_columns:
+            source_value = disbursement_sheet.cell(row=source_row, column=col).value
+            if source_value and isinstance(source_value, str) and source_value.startswith('='):
+                translators[col] = Translator(source_value, origin=f"{col_letters[col]}{source_row}")
+
         for row in range(11, last_row):
-            for col in formula_columns:
-                source_cell = disbursement_sheet.cell(row=source_row, column=col)
-                if source_cell.value and isinstance(source_cell.value, str) and source_cell.value.startswith('='):
-                    # Calculate row offset
-                    row_offset = row - source_row
-                    # Translate formula with proper row offset
-                    translated_formula = Translator(source_cell.value, origin=f"{get_column_letter(col)}{source_row}").translate_formula(
-                        f"{get_column_letter(col)}{row}", row_delta=row_offset, col_delta=0
-                    )
-                    disbursement_sheet.cell(row=row, column=col).value = translated_formula
+            # Calculate row offset
+            row_offset = row - source_row
+            for col, translator in translators.items():
+                # Translate formula with proper row offset
+                translated_formula = translator.translate_formula(
+                    f"{col_letters[col]}{row}", row_delta=row_offset, col_delta=0
+                )
+                disbursement_sheet.cell(row=row, column=col).value = translated_formula
 
         print(f"Formulas copied to rows 11 through {last_row}")
 
@@ -289,15 +368,17 @@ def consolidate_mt_reports():
         print(f"\nAdding totals in row {total_row} for columns D, E, F, G...")
 
         # Add SUM formulas for columns D, E, F, G
-        for col in formula_columns:
-            col_letter = get_column_letter(col)
-            sum_formula = f"=SUM({col_letter}3:{col_letter}{last_row})"
+        sum_formulas = [f"=SUM({col_letters[col]}3:{col_letters[col]}{last_row})" for col in formula_columns]
+        for col, sum_formula in zip(formula_columns, sum_formulas):
             disbursement_sheet.cell(row=total_row, column=col).value = sum_formula
-            print(f"Column {col_letter}: {sum_formula}")
+            print(f"Column {col_letters[col]}: {sum_formula}")
 
-        # Read Disbursement sheet data (skip first 2 rows) and create pivot table
-        print(f"\nReading Disbursement sheet data (skipping 2 rows) for pivot table...")
-        disbursement_df = pd.read_excel(mt_output_file, sheet_name='Disbursement', skiprows=2)
+        # Build the Disbursement data for the pivot table from consolidated_df in memory
+        # (Total is the row sum of the lending columns, as the sheet's Total column)
+        print(f"\nBuilding Disbursement data for pivot table...")
+        disbursement_df = consolidated_df.rename(columns={'Gender': 'Male/Female/Other'}).assign(
+            Total=consolidated_df[lending_columns].sum(axis=1)
+        )
 
         # Create pivot table with Gender as rows, Count of Client Name and Sum of Total
         pivot_table = disbursement_df.pivot_table(
@@ -317,22 +398,17 @@ def consolidate_mt_reports():
         start_row = 9
         start_col = 10  # Column J
 
-        # Write headers
-        for col_idx, header in enumerate(pivot_table.columns):
-            disbursement_sheet.cell(row=start_row, column=start_col + col_idx).value = header
-
-        # Write data rows
-        for row_idx, row_data in pivot_table.iterrows():
+        # Write headers and data rows in one pass
+        pivot_rows = [tuple(pivot_table.columns)] + list(pivot_table.itertuples(index=False, name=None))
+        for row_idx, row_data in enumerate(pivot_rows):
             for col_idx, value in enumerate(row_data):
-                disbursement_sheet.cell(row=start_row + 1 + row_idx, column=start_col + col_idx).value = value
+                disbursement_sheet.cell(row=start_row + row_idx, column=start_col + col_idx).value = value
 
         print(f"Pivot table written to J9:L{start_row + len(pivot_table)}")
 
-
-        wb.save(mt_output_file)
-        print(f"\nWorkbook saved with formulas and totals")
-
+    save_workbook_fast(wb, mt_output_file)
     wb.close()
+    print(f"\nWorkbook saved to {mt_output_file} with formulas and totals")
 
     return consolidated_df
 
@@ -4,17 +4,46 @@ import os
 import glob
 from datetime import datetime, timedelta
 import argparse
+import contextlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+# pyarrow is optional: without it the .xlsx inputs are simply re-read on every run
+# and text columns stay as numpy object arrays
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+try:
+    pd.get_option('future.infer_string')
+    ARROW_STRINGS = PYARROW_AVAILABLE
+except KeyError:
+    ARROW_STRINGS = False  # pandas < 2.1 has no Arrow string inference
+
 from FixedLoans import create_fixed_loans_df
-from MT import create_marginal_loans_df
+from MT import create_marginal_loans_df, build_row_formulas
 from FDLquarter import create_FDL_quarter_df
 from disbursement_processor import get_disbursement_df
 from mt_report_consolidator import consolidate_mt_reports
+from xlsb_reader import read_xlsb_columns
 
 # Define constants - paths relative to script root directory
 SCRIPT_ROOT = os.path.dirname(os.path.abspath(__file__))
 
+# Per-row Summary sheet formulas; {row} is replaced with the Excel row number
+REPAYMENT_CYCLE_FORMULA = '=IF(OR(AE{row}="M",AE{row}="D"),"Monthly Basis","Other")'
+CBSL_DPD_FORMULA = '=F{row}'
+FORBONE_FORMULA = '=IF(ISNUMBER(MATCH(A{row},\'MOI List -31 Jan\'!A:A, 0)), "Yes", "No")'
+EXP_DP_IIS_FORMULA = '=Y{row}-T{row}'
+GROSS_IMP_IIS_FORMULA = '=E{row}-J{row}-T{row}'
+EXP_DP_IMP_IIS_FORMULA = '=Y{row}-Z{row}-T{row}'
+COLLATERAL_FORMULA = '=IF(ISNUMBER(MATCH(A{row},\'Property Mortgage List\'!A:A,0)),"Immovable Properties",IF(OR(AA{row}="UV",AA{row}="LE",AA{row}="AT"),"Vehicles and Machinery",IF(ISNUMBER(MATCH(R{row},Cat_List!$A$2:$A$9,0)),"Vehicles and Machinery",IF(A{row}="Margin Trading","Shares and Debt Securities-Listed","Personal and Corporate Guarantees"))))'
+GENDER_FORMULA = '=IF(LEFT(B{row},1)="2",_xlfn.XLOOKUP(B1,BusinessGender!A:A,BusinessGender!C:C,"No Data"),IF(LEFT(AT{row},3)="Mr.","Male",IF(LEFT(AT{row},3)="Mr ","Male",IF(LEFT(AT{row},3)="Rev","Male",IF(LEFT(AT{row},4)="Miss","Female",IF(LEFT(AT{row},3)="Ms.","Female",IF(LEFT(AT{row},4)="Mrs.","Female"))))))'
+WALTV_FORMULA = '=IF(AO{row}="Vehicles and Machinery",(E{row}/$AZ$1)*AZ{row},0)'
+TOP50_FORMULA = '=VLOOKUP(B{row},\'Top50\'!A:E,5,0)'
+
 parent_directory = Path(SCRIPT_ROOT).parent
 
 # Allow passing the <date-folder> explicitly; fallback to auto-detect
@@ -55,6 +84,7 @@ current_month_date = now.replace(day=1) - timedelta(days=1)  # Last day of previ
 # Folder paths (operate strictly within <date-folder>)
 INPUT_FOLDER = str(date_folder / "Input")
 OUTPUT_FOLDER = str(date_folder)
+CACHE_FOLDER = date_folder / "cache"
 
 def find_file_with_pattern(folder_path, pattern):
     """Find file using glob pattern within folder_path (including subfolders) and return the first match"""
@@ -67,6 +97,106 @@ def find_file_with_pattern(folder_path, pattern):
         print(f"Warning: No file found matching pattern: {pattern}")
         return None
 
+def lookup_columns(keys, source_df, key_col, value_cols, keep='last'):
+    """
+    Look up value_cols of source_df for every key with a single reindex on key_col.
+
+    Duplicate keys in source_df resolve to the `keep` occurrence ('last' matches the
+    dict(zip(...)) + Series.map lookups this replaces). Returns a DataFrame with one
+    row per key, aligned with `keys`.
+
+    Categorical keys are hashed only once (when they were made categorical): each
+    distinct key is looked up and the result is expanded with the category codes.
+    """
+    lookup = source_df.drop_duplicates(subset=key_col, keep=keep).set_index(key_col)[value_cols]
+    if isinstance(keys.dtype, pd.CategoricalDtype):
+        # Code -1 (missing key) takes the trailing NaN entry, as a join on NaN would
+        categories = keys.cat.categories.astype(object).append(pd.Index([np.nan], dtype=object))
+        values = lookup.reindex(categories).take(keys.cat.codes.to_numpy())
+        values.index = keys.index
+        return values
+    # Reindex rather than join: keys whose dtype differs from key_col's (text against
+    # numbers) find no match and give NaN, as the Series.map lookups did, instead of raising
+    values = lookup.reindex(keys.astype(object))
+    values.index = keys.index
+    return values
+
+def read_excel_cached(path, sheet_name=0, skiprows=None):
+    """
+    pd.read_excel(path, sheet_name=sheet_name, skiprows=skiprows) with a Parquet cache.
+
+    The cache file is keyed on the source file's name, sheet, skiprows and mtime, so
+    replacing the input file invalidates it. Falls back to a plain read_excel when
+    pyarrow is not installed or the frame cannot be stored as Parquet.
+    """
+    if not PYARROW_AVAILABLE:
+        return pd.read_excel(path, sheet_name=sheet_name, skiprows=skiprows)
+
+    source = Path(path)
+    cache_prefix = f"{source.stem}_{sheet_name}_{skiprows}"
+    cache_file = CACHE_FOLDER / f"{cache_prefix}_{source.stat().st_mtime_ns}.parquet"
+    if cache_file.exists():
+        return pd.read_parquet(cache_file)
+
+    df = pd.read_excel(path, sheet_name=sheet_name, skiprows=skiprows)
+    try:
+        CACHE_FOLDER.mkdir(exist_ok=True)
+        # Drop caches of older versions of this input before writing the new one
+        for stale in CACHE_FOLDER.glob(f"{glob.escape(cache_prefix)}_*.parquet"):
+            stale.unlink()
+        df.to_parquet(cache_file, index=False)
+    except Exception as e:
+        print(f"Warning: could not cache {source.name} as Parquet: {e}")
+        if cache_file.exists():
+            cache_file.unlink()
+    return df
+
+def write_frame(ws, df, start_row, start_col=1, header=False):
+    """
+    Paste df into ws with its top-left value at (start_row, start_col).
+
+    Each column is cleaned (inf/NaN become blank cells, via a single mask) and
+    converted to Python values in bulk, so the whole frame is never copied and no
+    per-cell isinstance/.item() dispatch is needed. Strings starting with '=' are
+    picked up as formulas by openpyxl. When header is True the column names are
+    written on start_row first.
+
+    When the data rows start right below the last used row of the sheet (e.g. after
+    delete_rows), whole rows are written with ws.append(); otherwise cell by cell.
+    Returns the written data values, one list per column.
+    """
+    first_data_row = start_row + 1 if header else start_row
+    if header:
+        for j, col_name in enumerate(df.columns, start=start_col):
+            ws.cell(row=start_row, column=j, value=col_name)
+
+    written = []
+    for col_name, col in df.items():
+        # Blank out NaN/NaT and +/-inf with one boolean mask instead of replace() + fillna()
+        arr = col.to_numpy()
+        if arr.dtype.kind == 'f':
+            mask = ~np.isfinite(arr)
+        else:
+            mask = col.isna().to_numpy()
+            if arr.dtype == object:
+                mask = mask | col.isin([np.inf, -np.inf]).to_numpy()
+        values = col.astype(object).to_numpy(copy=True)
+        values[mask] = ''
+        written.append(values.tolist())
+
+    # ws.append() writes to the row after ws.max_row (delete_rows() moves that cursor up too),
+    # so it only lands on first_data_row when nothing is stored from that row down
+    if ws.max_row == first_data_row - 1:
+        # Columns left of start_col are padded with None, which openpyxl does not save
+        padding = (None,) * (start_col - 1)
+        for row in zip(*written):
+            ws.append(padding + row)
+    else:
+        for j, values in enumerate(written, start=start_col):
+            for i, val in enumerate(values, start=first_data_row):
+                ws.cell(row=i, column=j).value = val
+    return written
+
 def generate_dynamic_file_paths():
     """Generate all file paths dynamically based on current date"""
     # Current month report is for previous month (end date)
@@ -126,72 +256,102 @@ for key, path in file_paths_dict.items():
     status = "✓" if path else "✗"
     print(f"{status} {key}: {path if path else 'NOT FOUND'}")
 
-df = pd.read_excel(file_path, sheet_name='SUMMARY', skiprows=2, engine='pyxlsb')
-portfolio_df = pd.read_excel(file_path_portfolio, sheet_name='Portfolio', skiprows=2, engine='pyxlsb')
-net_portfolio_df = pd.read_excel(file_path_netPortfolio)
-cbsl_provision = pd.read_excel(cbsl_provision, sheet_name='Portfolio', skiprows=2, engine='pyxlsb')
-
-
+# Columns actually used from the wide .xlsb sheets; only these are decoded (column pushdown).
+# SUMMARY keeps every column up to and including STAGE, except the three below.
+SUMMARY_DROPPED_COLUMNS = ['RELATED-PARTY CONTRACT', 'STAFF CONTRACT', 'ACTUAL LEASE/LOAN']
+# The monthly report list also covers what create_fixed_loans_df and create_FDL_quarter_df use.
+PROVISION_COLUMNS = ['CONTRACT NO', 'PROVISION CATEGORY', 'FINAL PROVISION (CBSL GUIDELINE)', 'CBSL P/NP']
+SECTOR_COLUMNS = ['Contract No', 'CBSL Sector 1 Final']
+MONTHLY_REPORT_COLUMNS = [
+    'Contract No', 'Product', 'Product Type', 'Corporate Clients', 'Frequency', 'Contract Period',
+    'Tenure (Months)', 'Contractual Interest rate', 'Contract Amount', 'Annual Contract Interest',
+    'EIR (%)', 'Gross Outstanding', 'PD Category', 'Collateral/Security Type', 'Initial Valuation',
+    'LTV %', 'WALTV %',
+]
+
+# The input workbooks are independent of each other, so read them concurrently
+read_tasks = {
+    'df': lambda: read_xlsb_columns(
+        file_path, 'SUMMARY', skiprows=2,
+        keep_cols=lambda header: [name for name in header[:header.index('STAGE') + 1]
+                                  if name not in SUMMARY_DROPPED_COLUMNS]),
+    'net_portfolio_df': lambda: read_excel_cached(file_path_netPortfolio),
+    'cbsl_provision': lambda: read_xlsb_columns(cbsl_provision, 'Portfolio', skiprows=2, keep_cols=PROVISION_COLUMNS),
+    'df_sector': lambda: read_xlsb_columns(file_path_cbsl_sec, 'Portfolio', skiprows=1, keep_cols=SECTOR_COLUMNS),
+    'df_district': lambda: read_excel_cached(file_path_district),
+    'df_micro_dis': lambda: read_excel_cached(file_path_micro, sheet_name=0, skiprows=4),
+    'df_micro_port': lambda: read_excel_cached(file_path_micro, sheet_name=1, skiprows=3),
+    'df_reschedule': lambda: read_excel_cached(file_path_reschedule),
+    'df_monthly_report': lambda: read_xlsb_columns(file_path_monthlyreport, 'C1 & C2 Working', skiprows=1,
+                                                   keep_cols=MONTHLY_REPORT_COLUMNS),
+}
+# Read all-text columns (contract/client keys, names) as Arrow-backed strings so the joins,
+# drop_duplicates and isin calls below hash them in Arrow rather than per Python object.
+# Mixed numeric/text columns stay object, so key matching is unchanged. The option is only
+# set for these reads: frames built later (FixedLoans, MT, ...) keep their usual dtypes.
+arrow_strings = pd.option_context('future.infer_string', True) if ARROW_STRINGS else contextlib.nullcontext()
+with arrow_strings, ThreadPoolExecutor(max_workers=min(8, len(read_tasks))) as executor:
+    futures = {executor.submit(task): name for name, task in read_tasks.items()}
+    input_frames = {futures[future]: future.result() for future in as_completed(futures)}
+
+df = input_frames['df']
+net_portfolio_df = input_frames['net_portfolio_df']
+cbsl_provision = input_frames['cbsl_provision']
+df_sector = input_frames['df_sector']
+df_district = input_frames['df_district']
+df_micro_dis = input_frames['df_micro_dis']
+df_micro_port = input_frames['df_micro_port']
+df_reschedule = input_frames['df_reschedule']
+df_monthly_report = input_frames['df_monthly_report']
 
-# Find the STAGE column index
-stage_col_index = df.columns.get_loc('STAGE')
-
-# Keep only columns up to and including STAGE
-df = df.iloc[:, :stage_col_index + 1]
-
-maindf = df.drop(columns=['RELATED-PARTY CONTRACT','STAFF CONTRACT','ACTUAL LEASE/LOAN'])
+# Clean up column names
+net_portfolio_df.columns = net_portfolio_df.columns.str.strip()
 
-maindf = maindf.dropna(subset=['CONTRACT NO'])
+# df already holds only the SUMMARY columns up to STAGE (see SUMMARY_DROPPED_COLUMNS)
+maindf = df.dropna(subset=['CONTRACT NO'])
 
-contract_to_freq = dict(zip(net_portfolio_df["CONTRACT_NO"], net_portfolio_df["CON_RNTFREQ"]))
-contract_to_sector = dict(zip(net_portfolio_df["CONTRACT_NO"], net_portfolio_df["SEC_DESC"]))
-contract_to_sub_sec= dict(zip(net_portfolio_df["CONTRACT_NO"], net_portfolio_df["SUB_SECTOR"]))
+# Every lookup below is keyed on CONTRACT NO or CLIENT NO, so hash those keys once as categoricals.
+# The original values are kept (no cast to str): numeric keys from Excel must keep matching
+# numeric keys in the other inputs, and the cells are written back as numbers.
+maindf['CONTRACT NO'] = maindf['CONTRACT NO'].astype('category')
+maindf['CLIENT NO'] = maindf['CLIENT NO'].astype('category')
 
-contract_to_prov_cat = dict(zip(cbsl_provision["CONTRACT NO"], cbsl_provision["PROVISION CATEGORY"]))
-contract_to_prov_guid = dict(zip(cbsl_provision["CONTRACT NO"], cbsl_provision["FINAL PROVISION (CBSL GUIDELINE)"]))
-contract_to_prov_pnp = dict(zip(cbsl_provision["CONTRACT NO"], cbsl_provision["CBSL P/NP"]))
+# One join per source frame fetches every column maindf needs from it
+net_portfolio_lookup = lookup_columns(maindf['CONTRACT NO'], net_portfolio_df, 'CONTRACT_NO',
+                                      ['CON_RNTFREQ', 'SEC_DESC', 'SUB_SECTOR', 'CONTRACT_AMOUNT'])
+provision_lookup = lookup_columns(maindf['CONTRACT NO'], cbsl_provision, 'CONTRACT NO',
+                                  ['PROVISION CATEGORY', 'FINAL PROVISION (CBSL GUIDELINE)', 'CBSL P/NP'])
 
 # Map the frequency values to the main dataframe
-maindf['Frequency'] = maindf['CONTRACT NO'].map(contract_to_freq)
+maindf['Frequency'] = net_portfolio_lookup['CON_RNTFREQ']
 
 # Add Repayment Cycle column with Excel formulas
 # Excel row 3 corresponds to df index 0 (since we skipped 2 rows)
-maindf['Repayment Cycle'] = [f'=IF(OR(AE{i+3}="M",AE{i+3}="D"),"Monthly Basis","Other")' for i in range(len(maindf))]
-maindf['CBSL DPD'] = [f'=F{i + 3}' for i in range(len(maindf))]
-maindf['Provision Category'] = maindf['CONTRACT NO'].map(contract_to_prov_cat)
-
-# Replace 'NO PROVISION' with 'Performing' in Provision Category column
-maindf['Provision Category'] = maindf['Provision Category'].replace('NO PROVISION', 'Performing')
-maindf['Provision - CBSL Guideline'] = maindf['CONTRACT NO'].map(contract_to_prov_guid)
-maindf['CBSL P/NP'] = maindf['CONTRACT NO'].map(contract_to_prov_pnp)
-maindf['Forbone Loans (Yes/No)'] = [f'=IF(ISNUMBER(MATCH(A{i + 3},\'MOI List -31 Jan\'!A:A, 0)), "Yes", "No")' for i in range(len(maindf))]
-maindf['EXP+DP-IIS'] = [f'=Y{i + 3}-T{i + 3}' for i in range(len(maindf))]
-maindf['Gross-Imp-IIS'] = [f'=E{i+3}-J{i+3}-T{i+3}' for i in range(len(maindf))]
-maindf['Exp+DP-IMP-IIS'] = [f'=Y{i+3}-Z{i+3}-T{i+3}' for i in range(len(maindf))]
-maindf['Collateral/Security Type'] = [f'=IF(ISNUMBER(MATCH(A{i+3},\'Property Mortgage List\'!A:A,0)),"Immovable Properties",IF(OR(AA{i+3}="UV",AA{i+3}="LE",AA{i+3}="AT"),"Vehicles and Machinery",IF(ISNUMBER(MATCH(R{i+3},Cat_List!$A$2:$A$9,0)),"Vehicles and Machinery",IF(A{i+3}="Margin Trading","Shares and Debt Securities-Listed","Personal and Corporate Guarantees"))))' for i in range(len(maindf))]
-maindf['Sector'] = maindf['CONTRACT NO'].map(contract_to_sector)
-maindf['Sub-Sector'] = maindf['CONTRACT NO'].map(contract_to_sub_sec)
+excel_rows = pd.Series(np.arange(3, len(maindf) + 3), index=maindf.index).astype(str)
+maindf['Repayment Cycle'] = build_row_formulas(REPAYMENT_CYCLE_FORMULA, excel_rows)
+maindf['CBSL DPD'] = build_row_formulas(CBSL_DPD_FORMULA, excel_rows)
+# Provision Category, with 'NO PROVISION' reported as 'Performing'
+provision_category = provision_lookup['PROVISION CATEGORY']
+maindf['Provision Category'] = provision_category.where(provision_category != 'NO PROVISION', 'Performing')
+maindf['Provision - CBSL Guideline'] = provision_lookup['FINAL PROVISION (CBSL GUIDELINE)']
+maindf['CBSL P/NP'] = provision_lookup['CBSL P/NP']
+maindf['Forbone Loans (Yes/No)'] = build_row_formulas(FORBONE_FORMULA, excel_rows)
+maindf['EXP+DP-IIS'] = build_row_formulas(EXP_DP_IIS_FORMULA, excel_rows)
+maindf['Gross-Imp-IIS'] = build_row_formulas(GROSS_IMP_IIS_FORMULA, excel_rows)
+maindf['Exp+DP-IMP-IIS'] = build_row_formulas(EXP_DP_IMP_IIS_FORMULA, excel_rows)
+maindf['Collateral/Security Type'] = build_row_formulas(COLLATERAL_FORMULA, excel_rows)
+maindf['Sector'] = net_portfolio_lookup['SEC_DESC']
+maindf['Sub-Sector'] = net_portfolio_lookup['SUB_SECTOR']
 #sector working calculation
 #TODO: Add sector working calculation
 
-df_sector = pd.read_excel(file_path_cbsl_sec, sheet_name='Portfolio', skiprows=1, engine='pyxlsb')
-contract_to_cbsl_sec= dict(zip(df_sector["Contract No"], df_sector["CBSL Sector 1 Final"]))
-maindf['CBSL Sector'] = maindf['CONTRACT NO'].map(contract_to_cbsl_sec)
-
-df_district = pd.read_excel(file_path_district)
-contract_to_district = dict(zip(df_district["CLM_CODE"], df_district["DISTRICT"]))
-maindf['CustomerDistrict(ClientMain)'] = maindf['CLIENT NO'].map(contract_to_district)
+maindf['CBSL Sector'] = lookup_columns(maindf['CONTRACT NO'], df_sector, 'Contract No', ['CBSL Sector 1 Final'])['CBSL Sector 1 Final']
 
-# Clean up column names
-net_portfolio_df.columns = net_portfolio_df.columns.str.strip()
+maindf['CustomerDistrict(ClientMain)'] = lookup_columns(maindf['CLIENT NO'], df_district, 'CLM_CODE', ['DISTRICT'])['DISTRICT']
 
 # Then try again
-df_unique = net_portfolio_df.drop_duplicates(subset=['CLIENT_CODE'], keep='first')
-contract_to_client_name = dict(zip(df_unique["CLIENT_CODE"], df_unique["CLM_NAME"]))
-maindf['Customer Name'] = maindf['CLIENT NO'].map(contract_to_client_name)
+maindf['Customer Name'] = lookup_columns(maindf['CLIENT NO'], net_portfolio_df, 'CLIENT_CODE', ['CLM_NAME'], keep='first')['CLM_NAME']
 
-df_micro_dis = pd.read_excel(file_path_micro, sheet_name=0, skiprows=4)
-df_micro_port = pd.read_excel(file_path_micro, sheet_name=1, skiprows=3)
 
 # Assuming your DataFrames are named df1 and df2
 
@@ -204,33 +364,30 @@ df2_relevant = df_micro_dis[['Client Code', 'Contract No', 'Product', 'Customer
 # Concatenate them
 combined_df = pd.concat([df1_relevant, df2_relevant], ignore_index=True)
 
-contract_to_ct_micro = dict(zip(combined_df["Contract No"], combined_df["Micro/Small/Medium"]))
-maindf['Micro/Small/Medium'] = maindf['CONTRACT NO'].map(contract_to_ct_micro)
+# Duplicated contracts (e.g. in both the portfolio and disbursement sheets) take the last row
+maindf['Micro/Small/Medium'] = lookup_columns(maindf['CONTRACT NO'], combined_df, 'Contract No', ['Micro/Small/Medium'])['Micro/Small/Medium']
 
 #TODO: get gender from DF and concat new data sheet and old sheet to be paste as values
-maindf['Gender'] = [f'=IF(LEFT(B{i + 3},1)="2",_xlfn.XLOOKUP(B1,BusinessGender!A:A,BusinessGender!C:C,"No Data"),IF(LEFT(AT{i + 3},3)="Mr.","Male",IF(LEFT(AT{i + 3},3)="Mr ","Male",IF(LEFT(AT{i + 3},3)="Rev","Male",IF(LEFT(AT{i + 3},4)="Miss","Female",IF(LEFT(AT{i + 3},3)="Ms.","Female",IF(LEFT(AT{i + 3},4)="Mrs.","Female"))))))' for i in range(len(maindf))]
+maindf['Gender'] = build_row_formulas(GENDER_FORMULA, excel_rows)
 
-df_reschedule = pd.read_excel(file_path_reschedule)
-contract_to_old_contract = dict(zip(df_reschedule["CLO_NEWCONNO"], df_reschedule["CON_NO"]))
-maindf['Old Contract No (Before Reschedule)'] = maindf['CONTRACT NO'].map(contract_to_old_contract)
+maindf['Old Contract No (Before Reschedule)'] = lookup_columns(maindf['CONTRACT NO'], df_reschedule, 'CLO_NEWCONNO', ['CON_NO'])['CON_NO']
 
-contract_to_grantAm= dict(zip(net_portfolio_df["CONTRACT_NO"], net_portfolio_df["CONTRACT_AMOUNT"]))
-maindf['Grant Amount'] = maindf['CONTRACT NO'].map(contract_to_grantAm)
+maindf['Grant Amount'] = net_portfolio_lookup['CONTRACT_AMOUNT']
 
-df_monthly_report = pd.read_excel(file_path_monthlyreport, sheet_name='C1 & C2 Working', skiprows=1, engine='pyxlsb')
-contract_to_initialVal= dict(zip(df_monthly_report["Contract No"], df_monthly_report["Initial Valuation"]))
-maindf['Initial Valuation'] = maindf['CONTRACT NO'].map(contract_to_initialVal)
+maindf['Initial Valuation'] = lookup_columns(maindf['CONTRACT NO'], df_monthly_report, 'Contract No', ['Initial Valuation'])['Initial Valuation']
 
 maindf['LTV %'] = np.where(maindf['Initial Valuation'].isna() | maindf['Grant Amount'].isna(), np.nan, maindf['Grant Amount'] / maindf['Initial Valuation'])
 
-maindf['WALTV %'] = [f'=IF(AO{i+3}="Vehicles and Machinery",(E{i+3}/$AZ$1)*AZ{i+3},0)' for i in range(len(maindf))]
+maindf['WALTV %'] = build_row_formulas(WALTV_FORMULA, excel_rows)
 fixedloan = create_fixed_loans_df(file_path_fixedloans, df_monthly_report, len(maindf))
 # Reset column names to match by position
 fixedloan.columns = maindf.columns
 
 # Now concat
 maindf = pd.concat([maindf, fixedloan], ignore_index=True)
-maindf['Top 50 Clients'] = [f'=VLOOKUP(B{i+3},\'Top50\'!A:E,5,0)' for i in range(len(maindf))]
+# maindf now includes the fixed loans, so the row numbers are rebuilt for its new length
+excel_rows = pd.Series(np.arange(3, len(maindf) + 3)).astype(str)
+maindf['Top 50 Clients'] = build_row_formulas(TOP50_FORMULA, excel_rows)
 
 
 marginal_loan = create_marginal_loans_df(file_path_MT, df_district, combined_df)
@@ -253,11 +410,17 @@ print(f"\nData written to {output_path}")
 
 # Open the report file and update sheets
 from openpyxl import load_workbook
+from openpyxl.utils import column_index_from_string
 
 print(f"\nUpdating {report_file}...")
 
-# First convert .xlsb to .xlsx if needed
-if report_file.endswith('.xlsb'):
+# First convert .xlsb to .xlsx if needed; an .xlsx converted since the .xlsb last changed is reused
+xlsx_candidate = Path(report_file).with_suffix('.xlsx')
+if (report_file.endswith('.xlsb') and xlsx_candidate.exists()
+        and xlsx_candidate.stat().st_mtime >= os.path.getmtime(report_file)):
+    print(f"Using existing conversion {xlsx_candidate.name}")
+    report_file = str(xlsx_candidate)
+elif report_file.endswith('.xlsb'):
     import xlwings as xw
     print("Converting .xlsb to .xlsx...")
     app = xw.App(visible=False)
@@ -279,14 +442,7 @@ if 'Summary' in wb.sheetnames:
     # Clear data from row 3 onwards
     ws_summary.delete_rows(3, ws_summary.max_row - 2)
     # Paste maindf to row 3 without headings
-    maindf_clean = maindf.replace([np.inf, -np.inf], np.nan).fillna('')
-    for i, row in enumerate(maindf_clean.values, start=3):
-        for j, val in enumerate(row, start=1):
-            cell = ws_summary.cell(row=i, column=j)
-            if isinstance(val, str) and val.startswith('='):
-                cell.value = val  # openpyxl auto-detects formulas
-            else:
-                cell.value = val.item() if isinstance(val, (np.integer, np.floating)) else val
+    write_frame(ws_summary, maindf, start_row=3)
     print("Updated SUMMARY sheet")
 
 # 2. MT sheet - clear from row 2 onwards and paste marginal_loan without headings
@@ -295,14 +451,7 @@ if 'MT' in wb.sheetnames:
     # Clear data from row 2 onwards
     ws_mt.delete_rows(2, ws_mt.max_row - 1)
     # Paste marginal_loan to row 2 without headings (starting at column C)
-    marginal_clean = marginal_loan.replace([np.inf, -np.inf], np.nan).fillna('')
-    for i, row in enumerate(marginal_clean.values, start=2):
-        for j, val in enumerate(row, start=3):  # Start at column C (3)
-            cell = ws_mt.cell(row=i, column=j)
-            if isinstance(val, str) and val.startswith('='):
-                cell.value = val
-            else:
-                cell.value = val.item() if isinstance(val, (np.integer, np.floating)) else val
+    write_frame(ws_mt, marginal_loan, start_row=2, start_col=3)
     print("Updated MT sheet")
 
 # 3. FDL Quarter sheet - clear from row 3 onwards and paste df_FDL_quarter without headings
@@ -311,14 +460,7 @@ if 'FDL Quarter' in wb.sheetnames:
     # Clear data from row 3 onwards
     ws_fdl.delete_rows(3, ws_fdl.max_row - 2)
     # Paste df_FDL_quarter to row 3 without headings
-    fdl_clean = df_FDL_quarter.replace([np.inf, -np.inf], np.nan).fillna('')
-    for i, row in enumerate(fdl_clean.values, start=3):
-        for j, val in enumerate(row, start=1):
-            cell = ws_fdl.cell(row=i, column=j)
-            if isinstance(val, str) and val.startswith('='):
-                cell.value = val
-            else:
-                cell.value = val.item() if isinstance(val, (np.integer, np.floating)) else val
+    write_frame(ws_fdl, df_FDL_quarter, start_row=3)
     print("Updated FDL Quarter sheet")
 
 # 3. FDL Quarter sheet - clear from row 3 onwards and paste df_FDL_quarter without headings
@@ -327,14 +469,7 @@ if 'Disbursement' in wb.sheetnames:
     # Clear data from row 3 onwards
     ws_fdl.delete_rows(5, ws_fdl.max_row - 2)
     # Paste df_FDL_quarter to row 3 without headings
-    disbursement_df = disbursement_df.replace([np.inf, -np.inf], np.nan).fillna('')
-    for i, row in enumerate(disbursement_df.values, start=5):
-        for j, val in enumerate(row, start=1):
-            cell = ws_fdl.cell(row=i, column=j)
-            if isinstance(val, str) and val.startswith('='):
-                cell.value = val
-            else:
-                cell.value = val.item() if isinstance(val, (np.integer, np.floating)) else val
+    write_frame(ws_fdl, disbursement_df, start_row=5)
     print("Updated Disbursement sheet")
 
 # MT-Disbursement
@@ -345,11 +480,13 @@ if 'Disbursement' in wb.sheetnames:
 
 print(f"\nReport file {output_report} updated successfully!")
 
-updated_report = pd.read_excel(output_report, sheet_name='Summary', skiprows=1)
-print(f'Updated report shape: {updated_report[['Client No', 'EXP+DP-IIS']]}')
-# Extract required columns from first dataframe
-updated_report_top50 = updated_report[['Contract No', 'Client No', 'Customer Name',]].copy()
-updated_report_top50['EXP+DP-IIS'] = updated_report['EXP+DP'] - updated_report['IIS']
+# The Summary sheet was just pasted from maindf, so take the Top50 inputs from maindf directly
+# instead of re-reading the saved report. EXP+DP and IIS are Summary columns Y and T (see EXP_DP_IIS_FORMULA).
+updated_report_top50 = maindf[['CONTRACT NO', 'CLIENT NO', 'Customer Name']].rename(
+    columns={'CONTRACT NO': 'Contract No', 'CLIENT NO': 'Client No'})
+updated_report_top50['EXP+DP-IIS'] = (maindf.iloc[:, column_index_from_string('Y') - 1].to_numpy()
+                                      - maindf.iloc[:, column_index_from_string('T') - 1].to_numpy())
+print(f"Updated report shape: {updated_report_top50[['Client No', 'EXP+DP-IIS']]}")
 
 # Assuming updated_MT_report is a dataframe, extract required columns
 # If it's a list as shown, you need to read it first from somewhere
@@ -375,26 +512,12 @@ if 'Top50' in wb.sheetnames:
     ws_fdl = wb['Top50']
     
     # Clear data in only columns A and B (from row 1 to max_row)
-    max_row = ws_fdl.max_row
-    for row in range(1, max_row + 1):
-        ws_fdl.cell(row=row, column=1).value = None  # Column A
-        ws_fdl.cell(row=row, column=2).value = None  # Column B
-    
-    # Paste final_df to Column A1 (including headers)
-    final_df_clean = final_df.replace([np.inf, -np.inf], np.nan).fillna('')
-    
-    # Write headers first (starting at row 1)
-    for j, col_name in enumerate(final_df_clean.columns, start=1):
-        ws_fdl.cell(row=1, column=j, value=col_name)
+    for row in ws_fdl.iter_rows(min_row=1, max_row=ws_fdl.max_row, min_col=1, max_col=2):
+        for cell in row:
+            cell.value = None
     
-    # Write data (starting at row 2)
-    for i, row in enumerate(final_df_clean.values, start=2):
-        for j, val in enumerate(row, start=1):
-            cell = ws_fdl.cell(row=i, column=j)
-            if isinstance(val, str) and val.startswith('='):
-                cell.value = val
-            else:
-                cell.value = val.item() if isinstance(val, (np.integer, np.floating)) else val
+    # Paste final_df to Column A1 (headers on row 1, data from row 2)
+    write_frame(ws_fdl, final_df, start_row=1, header=True)
     
     print("Updated Disbursement sheet with final_df in columns A and B")
 
@@ -402,23 +525,25 @@ wb.save(output_report)
 print("Final DataFrame:")
 print(final_df)
 
-#get the final df top 50 rows
+#get the final df top 50 rows (final_df is already fully sorted for the Top50 sheet, so this is just its head)
 final_df_top50 = final_df.head(50).copy()
 print(f'Final Top 50 shape: {final_df_top50[["Client No"]]}')
 final_df_top50['Top 50 Clients'] = "TOP 50"
 output_path = r'top50.xlsx'
 final_df_top50.to_excel(output_path, index=False)
-contract_toTop50 = dict(zip(final_df_top50["Client No"], final_df_top50['Top 50 Clients']))
 
-temp = pd.DataFrame()
-temp['Contract No'] = np.nan
-temp['Client No'] = marginal_loan['ICAM code']
-temp['Customer Name'] = marginal_loan['Name of the Client']
-temp['EXP+DP-IIS'] = marginal_loan['(ICAM) Debtor']
+temp = pd.DataFrame({
+    'Contract No': np.nan,
+    'Client No': marginal_loan['ICAM code'],
+    'Customer Name': marginal_loan['Name of the Client'],
+    'EXP+DP-IIS': marginal_loan['(ICAM) Debtor'],
+})
 
 updated_report_top50 = pd.concat([updated_report_top50, temp], ignore_index=True)
 
-updated_report_top50['Top 50 Clients'] = updated_report_top50['Client No'].map(contract_toTop50)
+# Flag the rows whose client is in the top 50 ("TOP 50", NaN otherwise) with one vectorised isin
+in_top50 = updated_report_top50['Client No'].isin(final_df_top50['Client No'])
+updated_report_top50['Top 50 Clients'] = pd.Series("TOP 50", index=updated_report_top50.index).where(in_top50)
 output_path = r'finaltop50.xlsx'
 updated_report_top50.to_excel(output_path, index=False)
 
@@ -426,39 +551,26 @@ Filtered_T50 = updated_report_top50[updated_report_top50['Top 50 Clients'] == "T
 print(f'Filtered Top 50 shape: {Filtered_T50.head()}')
 
 # merge Filtered T50 with df_district to get ID number (fall back to df_district mapping only)
-contract_to_id = dict(zip(df_district["CLM_CODE"], df_district["CLM_IDNO"]))
-Filtered_T50['NIC/Company Registration No.'] = Filtered_T50['Client No'].map(contract_to_id)
+Filtered_T50['NIC/Company Registration No.'] = lookup_columns(Filtered_T50['Client No'], df_district, 'CLM_CODE', ['CLM_IDNO'])['CLM_IDNO']
 
 #merge Filtered T50 with df monthly report to get Product Type
-contract_to_prod_type = dict(zip(df_monthly_report["Contract No"], df_monthly_report["Product Type"]))
-Filtered_T50['Type of Facility'] = Filtered_T50['Contract No'].map(contract_to_prod_type)
+Filtered_T50['Type of Facility'] = lookup_columns(Filtered_T50['Contract No'], df_monthly_report, 'Contract No', ['Product Type'])['Product Type']
 print(f'Filtered Top 50 shape: {Filtered_T50.head()}')
 
 datasett50 = Filtered_T50[['Contract No', 'Client No', 'Customer Name', 'NIC/Company Registration No.', 'Type of Facility']]
+# Rows pasted into C6 Working (row 2 onwards), kept for the NBD-QF-23-C6 sorted copy below
+c6_data_rows = []
 # Write to ws_fdl C6 Working Working Sheet staring from A1
 if 'C6 Working' in wb.sheetnames: 
     ws_c6 = wb['C6 Working']
     
     # Clear contents from columns A to E, from row 1 onwards
-    for row in range(1, ws_c6.max_row + 1):
-        for col in range(1, 6):  # Columns A to E
-            ws_c6.cell(row=row, column=col).value = None
+    for row in ws_c6.iter_rows(min_row=1, max_row=ws_c6.max_row, min_col=1, max_col=5):  # Columns A to E
+        for cell in row:
+            cell.value = None
     
-    # Paste Filtered_T50 to columns A to E with headings
-    filtered_clean = datasett50.replace([np.inf, -np.inf], np.nan).fillna('')
-    
-    # Write the headings in row 1 (column names)
-    for j, col_name in enumerate(filtered_clean.columns[:5], start=1):
-        ws_c6.cell(row=1, column=j).value = col_name
-    
-    # Write the data from row 2 onwards
-    for i, row in enumerate(filtered_clean.values, start=2):  # Start from row 2 to leave room for headings
-        for j, val in enumerate(row[:5], start=1):  # Only write columns A to E
-            cell = ws_c6.cell(row=i, column=j)
-            if isinstance(val, str) and val.startswith('='): 
-                cell.value = val  # openpyxl auto-detects formulas
-            else:
-                cell.value = val.item() if isinstance(val, (np.integer, np.floating)) else val
+    # Paste Filtered_T50 to columns A to E with headings in row 1 and data from row 2
+    c6_data_rows = list(zip(*write_frame(ws_c6, datasett50.iloc[:, :5], start_row=1, header=True)))
     
     print("Updated C6 Working sheet with Filtered_T50")
 
@@ -483,26 +595,21 @@ if 'C6 Working' in wb.sheetnames:
 if 'NBD-QF-23-C6 sorted' in wb.sheetnames:
     ws_c6_sorted = wb['NBD-QF-23-C6 sorted']
 
-    # Save the workbook first before reloading with data_only
-    wb.save(output_report)
-
-    # Load the workbook again with data_only=True to get calculated values from formulas
-    wb_data_only = load_workbook(output_report, data_only=True)
-    ws_c6_data_only = wb_data_only['C6 Working']
-
-    # Find the end of data in C6 Working sheet (column B as reference)
+    # C6 Working only holds values pasted above (no formulas), so the rows are taken from
+    # c6_data_rows instead of saving and reloading the workbook with data_only=True.
+    # Find the end of data (column B as reference); blank strings are saved as empty cells.
     last_data_row = 1
-    for row in range(2, ws_c6_data_only.max_row + 1):
-        if ws_c6_data_only.cell(row=row, column=2).value is not None and ws_c6_data_only.cell(row=row, column=2).value != '':
-            last_data_row = row
+    for values in c6_data_rows:
+        if values[1] is not None and values[1] != '':
+            last_data_row += 1
         else:
             break
 
     # Clear existing data in NBD-QF-23-C6 sorted from A6 to C(end of data) without deleting rows
     if ws_c6_sorted.max_row >= 6:
-        for row in range(6, ws_c6_sorted.max_row + 1):
-            for col in range(1, 4):  # Columns A to C
-                ws_c6_sorted.cell(row=row, column=col).value = None
+        for row in ws_c6_sorted.iter_rows(min_row=6, max_row=ws_c6_sorted.max_row, min_col=1, max_col=3):  # Columns A to C
+            for cell in row:
+                cell.value = None
 
     # Column mapping: C6 Working -> NBD-QF-23-C6 sorted
     # A -> A, C -> B, D -> C
@@ -513,15 +620,11 @@ if 'NBD-QF-23-C6 sorted' in wb.sheetnames:
     }
 
     # Copy data from row 2 to last_data_row in C6 Working to row 6 onwards in NBD-QF-23-C6 sorted (values only)
-    for i, source_row in enumerate(range(2, last_data_row + 1), start=6):
+    for i, values in enumerate(c6_data_rows[:last_data_row - 1], start=6):
         for source_col, dest_col in column_mapping.items():
-            value = ws_c6_data_only.cell(row=source_row, column=source_col).value
-            # Convert numpy types to Python native types
-            if isinstance(value, (np.integer, np.floating)):
-                value = value.item()
-            ws_c6_sorted.cell(row=i, column=dest_col).value = value
+            value = values[source_col - 1]
+            ws_c6_sorted.cell(row=i, column=dest_col).value = None if value == '' else value
 
-    wb_data_only.close()
     print(f"Copied data from C6 Working to NBD-QF-23-C6 sorted ({last_data_row - 1} rows)")
 else:
     print("Warning: 'NBD-QF-23-C6 sorted' sheet not found in workbook")
@@ -14,9 +14,15 @@ Output:
 """
 
 import openpyxl
+import logging
+import logging.handlers
+import os
+import shutil
+import fnmatch
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import sys
-import traceback
 
 # Import all report processing functions
 from NBD_MF_20_C2 import main as run_c2
@@ -25,56 +31,140 @@ from NBD_MF_20_C4 import main as run_c4
 from NBD_MF_20_C5 import main as run_c5
 from NBD_MF_20_C6 import main as run_c6
 
+logger = logging.getLogger("run_all_reports")
+
+def setup_logging():
+    """
+    Send runner messages to stdout through an in-memory buffer.
+
+    Messages are written in batches (up to 200 at a time) instead of one console write
+    per line; warnings and errors flush the buffer immediately. Returns the buffering
+    handler so callers can flush it at phase boundaries.
+    """
+    if not logger.handlers:
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(logging.handlers.MemoryHandler(
+            capacity=200, flushLevel=logging.WARNING, target=stream_handler))
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger.handlers[0]
+
 def find_files_safely(base_dir, pattern, description):
     """Safely find files and provide detailed error messages"""
-    print(f"Looking for {description} in: {base_dir}")
-    print(f"Search pattern: {pattern}")
+    logger.info(f"Looking for {description} in: {base_dir}")
+    logger.info(f"Search pattern: {pattern}")
     
     files = list(base_dir.glob(pattern))
-    print(f"Found {len(files)} files matching pattern:")
+    logger.info(f"Found {len(files)} files matching pattern:")
     
     if not files:
-        print(f"[ERROR] No files found matching pattern: {pattern}")
-        print("Available files in directory:")
+        logger.error(f"[ERROR] No files found matching pattern: {pattern}")
+        logger.info("Available files in directory:")
         try:
             all_files = [f.name for f in base_dir.iterdir() if f.is_file() and f.suffix == '.xlsx']
             if all_files:
                 for file in sorted(all_files):
-                    print(f"  - {file}")
+                    logger.info(f"  - {file}")
             else:
-                print("  No .xlsx files found in directory")
+                logger.info("  No .xlsx files found in directory")
         except Exception as e:
-            print(f"  Error listing files: {e}")
+            logger.info(f"  Error listing files: {e}")
         return None
     
     for file in files:
-        print(f"  [OK] {file.name}")
+        logger.info(f"  [OK] {file.name}")
     
     return files[0]  # Return the first match
 
-def find_first_matching(search_dirs, pattern):
-    """Find first matching file in search directories"""
+# Folders never searched for input files (previous outputs, VCS and virtualenv trees)
+PRUNED_DIRS = {"outputs", ".git", "__pycache__", ".venv", "venv"}
+
+def _walk_files(top):
+    """Paths of all files under top, skipping PRUNED_DIRS"""
+    files = []
+    for dirpath, dirnames, filenames in os.walk(top):
+        dirnames[:] = [d for d in dirnames if d not in PRUNED_DIRS]
+        files.extend(Path(dirpath) / name for name in filenames)
+    return files
+
+def scan_files(root):
+    """
+    Walk root once, skipping PRUNED_DIRS, and return the paths of all files under it.
+
+    Each top-level subfolder is walked in its own thread so directory reads overlap.
+    Results are joined in listing order, so the order matches a single os.walk(root).
+    """
+    root = Path(root)
+    files = []
+    subdirs = []
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                # os.walk does not descend into symlinked folders either
+                if entry.name not in PRUNED_DIRS and not entry.is_symlink():
+                    subdirs.append(entry.path)
+            else:
+                files.append(root / entry.name)
+    
+    with ThreadPoolExecutor(max_workers=min(8, len(subdirs) or 1)) as executor:
+        for subdir_files in executor.map(_walk_files, subdirs):
+            files.extend(subdir_files)
+    return files
+
+def find_first_matching(search_dirs, pattern, files):
+    """
+    Find first matching file in search directories.
+
+    Args:
+    - search_dirs: directories to try, in order
+    - pattern: recursive glob such as "**/NBD-MF-20-C1 to C6*.xlsx"
+    - files: file paths from scan_files(), so no directory is walked again here
+    """
+    name_pattern = pattern.split("/")[-1]
     for search_dir in search_dirs:
-        if search_dir.exists():
-            files = list(search_dir.glob(pattern))
-            if files:
-                return files[0]
+        for path in files:
+            if search_dir in path.parents and fnmatch.fnmatch(path.name, name_pattern):
+                return path
     return None
 
+def get_working_folder_name(file_path, search_dirs):
+    """Name of the top-level subfolder of the first search directory that contains file_path"""
+    for search_dir in search_dirs:
+        if search_dir in file_path.parents:
+            relative_parts = file_path.relative_to(search_dir).parts
+            if len(relative_parts) > 1:
+                return relative_parts[0]
+    return None
+
+# Short and full month names accepted in file names
+MONTH_NAMES = frozenset({
+    "Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec",
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December",
+})
+
+@functools.lru_cache(maxsize=256)
 def get_month_year_from_filename(filename):
     """Extract month and year from filename"""
     parts = filename.split()
     for i, part in enumerate(parts):
-        if part in {"Jan","Feb","Mar","Apr","May","Jun","Jul","Aug","Sep","Oct","Nov","Dec","January","February","March","April","May","June","July","August","September","October","November","December"}:
+        if part in MONTH_NAMES:
             month = part
             year = parts[i+1].replace(".xlsx","").replace(".xlsb","")
             return month, year
     return None, None
 
 def main():
-    """Main function to run all report processing scripts in sequence"""
-    print("Starting CBSL Reporting Automation - Master Runner")
-    print("=" * 60)
+    """
+    Main function to run all report processing scripts in sequence.
+
+    The C1-C6 workbook is loaded once and modified by each script. The AFL workbook is
+    only a read-only source for C2 and C6, so it is opened in openpyxl's read-only mode.
+    """
+    log_handler = setup_logging()
+    logger.info("Starting CBSL Reporting Automation - Master Runner")
+    logger.info("=" * 60)
     
     # Get the base directory (parent of report_automations)
     base_dir = Path(__file__).resolve().parent.parent
@@ -82,73 +172,65 @@ def main():
     monthly_working_dir = working_dir / "monthly"
     outputs_monthly_dir = base_dir / "outputs" / "monthly"
     
-    print(f"Base directory: {base_dir}")
-    print(f"Working directory: {working_dir}")
-    print(f"Monthly working directory: {monthly_working_dir}")
+    logger.info(f"Base directory: {base_dir}")
+    logger.info(f"Working directory: {working_dir}")
+    logger.info(f"Monthly working directory: {monthly_working_dir}")
     
     # Create outputs monthly directory if it doesn't exist
     outputs_monthly_dir.mkdir(parents=True, exist_ok=True)
     
     # Search directories
     search_dirs = [monthly_working_dir, working_dir, base_dir]
+    # Walk the tree once; every lookup below filters this list in memory
+    all_files = scan_files(base_dir)
     
     # Locate required files
-    print(f"\n[INFO] Locating required files...")
+    logger.info(f"\n[INFO] Locating required files...")
     
     # Main C1-C6 file (required)
-    file_c1_c6 = find_first_matching(search_dirs, "**/NBD-MF-20-C1 to C6*.xlsx")
+    file_c1_c6 = find_first_matching(search_dirs, "**/NBD-MF-20-C1 to C6*.xlsx", all_files)
     if not file_c1_c6:
-        print("[ERROR] Could not find C1 to C6 file")
+        logger.error("[ERROR] Could not find C1 to C6 file")
         return
     
     # AFL file (required for C2 and C6)
-    file_afl = find_first_matching(search_dirs, "**/NBD-MF-01-SOFP & SOCI AFL Monthly FS*.xlsx")
+    file_afl = find_first_matching(search_dirs, "**/NBD-MF-01-SOFP & SOCI AFL Monthly FS*.xlsx", all_files)
     if not file_afl:
-        print("[ERROR] Could not find AFL file")
+        logger.error("[ERROR] Could not find AFL file")
         return
     
     # Additional files for C3
-    file_car = find_first_matching(search_dirs, "**/CAR Working*.xlsb")
-    file_prod = find_first_matching(search_dirs, "**/Prod. wise Class. of Loans*.xlsb")
-    file_cbsl = find_first_matching(search_dirs, "**/CBSL Provision Comparison*.xlsb")
-    file_sofp = find_first_matching(search_dirs, "**/NBD-MF-01-SOFP*.xlsx")
+    file_car = find_first_matching(search_dirs, "**/CAR Working*.xlsb", all_files)
+    file_prod = find_first_matching(search_dirs, "**/Prod. wise Class. of Loans*.xlsb", all_files)
+    file_cbsl = find_first_matching(search_dirs, "**/CBSL Provision Comparison*.xlsb", all_files)
+    file_sofp = find_first_matching(search_dirs, "**/NBD-MF-01-SOFP*.xlsx", all_files)
     
     # Unutilized file for C4
-    file_unutilized = find_first_matching(search_dirs, "**/Unutilized Credit Limits*.xlsx")
+    file_unutilized = find_first_matching(search_dirs, "**/Unutilized Credit Limits*.xlsx", all_files)
     
-    print(f"[OK] C1-C6: {file_c1_c6}")
-    print(f"[OK] AFL: {file_afl}")
+    logger.info(f"[OK] C1-C6: {file_c1_c6}")
+    logger.info(f"[OK] AFL: {file_afl}")
     if file_car:
-        print(f"[OK] CAR Working: {file_car}")
+        logger.info(f"[OK] CAR Working: {file_car}")
     if file_prod:
-        print(f"[OK] Prod wise: {file_prod}")
+        logger.info(f"[OK] Prod wise: {file_prod}")
     if file_cbsl:
-        print(f"[OK] CBSL Provision: {file_cbsl}")
+        logger.info(f"[OK] CBSL Provision: {file_cbsl}")
     if file_sofp:
-        print(f"[OK] SOFP: {file_sofp}")
+        logger.info(f"[OK] SOFP: {file_sofp}")
     if file_unutilized:
-        print(f"[OK] Unutilized: {file_unutilized}")
+        logger.info(f"[OK] Unutilized: {file_unutilized}")
     
     # Extract month and year from filename
     month, year = get_month_year_from_filename(file_c1_c6.name)
     if not month or not year:
-        print(f"[ERROR] Could not parse month/year from filename: {file_c1_c6.name}")
+        logger.error(f"[ERROR] Could not parse month/year from filename: {file_c1_c6.name}")
         return
     
-    print(f"\n[OK] Parsed month: {month}, year: {year}")
+    logger.info(f"\n[OK] Parsed month: {month}, year: {year}")
     
-    # Determine output folder
-    working_folder_name = None
-    for search_dir in search_dirs:
-        if search_dir.exists():
-            for subfolder in search_dir.iterdir():
-                if subfolder.is_dir():
-                    c1 = list(subfolder.glob("**/NBD-MF-20-C1 to C6*.xlsx"))
-                    if c1:
-                        working_folder_name = subfolder.name
-                        break
-            if working_folder_name:
-                break
+    # Determine output folder (the working subfolder the C1-C6 file was found in)
+    working_folder_name = get_working_folder_name(file_c1_c6, search_dirs)
     
     if working_folder_name:
         out_folder = outputs_monthly_dir / working_folder_name
@@ -156,117 +238,85 @@ def main():
         out_folder = outputs_monthly_dir / f"{year}_{month}"
     
     out_folder.mkdir(parents=True, exist_ok=True)
-    print(f"Output folder: {out_folder}")
+    logger.info(f"Output folder: {out_folder}")
+    
+    # Use input file name as base for output file name
+    input_filename = file_c1_c6.stem  # Get filename without extension
+    output_file = out_folder / f"{input_filename}.xlsx"
+    # Working copy of the input; it only replaces output_file once the final save succeeds,
+    # so a failed run never leaves an unmodified copy that looks like a finished output
+    partial_file = out_folder / f"{input_filename}.partial.xlsx"
     
+    wb_afl = None
     try:
-        # Load main workbook once
-        print(f"\n[LOAD] Loading main workbook...")
-        wb_c1_c6 = openpyxl.load_workbook(file_c1_c6, data_only=False)
-        print(f"[OK] Main workbook loaded successfully")
+        # Work on a copy so the input file is never opened for writing
+        logger.info(f"\n[LOAD] Loading main workbook...")
+        log_handler.flush()
+        shutil.copy2(file_c1_c6, partial_file)
+        wb_c1_c6 = openpyxl.load_workbook(partial_file, data_only=False)
+        logger.info(f"[OK] Main workbook loaded successfully")
         
-        # Load AFL workbook
-        print(f"[LOAD] Loading AFL workbook...")
-        wb_afl = openpyxl.load_workbook(file_afl, data_only=True)
-        print(f"[OK] AFL workbook loaded successfully")
+        # Load AFL workbook (values only, read-only: it is never modified)
+        logger.info(f"[LOAD] Loading AFL workbook...")
+        wb_afl = openpyxl.load_workbook(file_afl, data_only=True, read_only=True, keep_links=False)
+        logger.info(f"[OK] AFL workbook loaded successfully")
         
         # Process all reports in sequence
-        print(f"\n[PROCESS] Processing all reports in sequence...")
-        print("=" * 60)
+        logger.info(f"\n[PROCESS] Processing all reports in sequence...")
+        logger.info("=" * 60)
         
-        # C2 Report
-        print(f"\n[PROCESS] Processing C2 Report...")
-        try:
-            wb_c1_c6 = run_c2(wb_c1_c6, wb_afl)
-            if wb_c1_c6:
-                print(f"[OK] C2 Report completed successfully")
-            else:
-                print(f"[ERROR] C2 Report failed")
-                return
-        except Exception as e:
-            print(f"[ERROR] C2 Report failed with error: {e}")
-            traceback.print_exc()
-            return
-        
-        # C3 Report
-        print(f"\n[PROCESS] Processing C3 Report...")
-        try:
-            if all([file_car, file_prod, file_cbsl]):
-                wb_c1_c6 = run_c3(wb_c1_c6, file_car, file_prod, file_cbsl, file_sofp, out_folder)
-                if wb_c1_c6:
-                    print(f"[OK] C3 Report completed successfully")
-                else:
-                    print(f"[ERROR] C3 Report failed")
-                    return
-            else:
-                print(f"[WARN] Skipping C3 Report - missing required files")
-        except Exception as e:
-            print(f"[ERROR] C3 Report failed with error: {e}")
-            traceback.print_exc()
-            return
-        
-        # C4 Report
-        print(f"\n[PROCESS] Processing C4 Report...")
-        try:
-            if file_unutilized:
-                wb_c1_c6 = run_c4(wb_c1_c6, file_unutilized)
-                if wb_c1_c6:
-                    print(f"[OK] C4 Report completed successfully")
-                else:
-                    print(f"[ERROR] C4 Report failed")
-                    return
-            else:
-                print(f"[WARN] Skipping C4 Report - missing unutilized file")
-        except Exception as e:
-            print(f"[ERROR] C4 Report failed with error: {e}")
-            traceback.print_exc()
-            return
+        # (report, function, arguments after the workbook, reason to skip or None)
+        reports = [
+            ("C2", run_c2, (wb_afl,), None),
+            ("C3", run_c3, (file_car, file_prod, file_cbsl, file_sofp, out_folder),
+             None if all([file_car, file_prod, file_cbsl]) else "missing required files"),
+            ("C4", run_c4, (file_unutilized,), None if file_unutilized else "missing unutilized file"),
+            ("C5", run_c5, (), None),
+            ("C6", run_c6, (wb_afl,), None),
+        ]
         
-        # C5 Report
-        print(f"\n[PROCESS] Processing C5 Report...")
-        try:
-            wb_c1_c6 = run_c5(wb_c1_c6)
-            if wb_c1_c6:
-                print(f"[OK] C5 Report completed successfully")
-            else:
-                print(f"[ERROR] C5 Report failed")
+        for name, run_report, report_args, skip_reason in reports:
+            logger.info(f"\n[PROCESS] Processing {name} Report...")
+            log_handler.flush()
+            if skip_reason:
+                logger.warning(f"[WARN] Skipping {name} Report - {skip_reason}")
+                continue
+            try:
+                wb_c1_c6 = run_report(wb_c1_c6, *report_args)
+            except Exception as e:
+                logger.exception(f"[ERROR] {name} Report failed with error: {e}")
                 return
-        except Exception as e:
-            print(f"[ERROR] C5 Report failed with error: {e}")
-            traceback.print_exc()
-            return
-        
-        # C6 Report
-        print(f"\n[PROCESS] Processing C6 Report...")
-        try:
-            wb_c1_c6 = run_c6(wb_c1_c6, wb_afl)
-            if wb_c1_c6:
-                print(f"[OK] C6 Report completed successfully")
-            else:
-                print(f"[ERROR] C6 Report failed")
+            if not wb_c1_c6:
+                logger.error(f"[ERROR] {name} Report failed")
                 return
-        except Exception as e:
-            print(f"[ERROR] C6 Report failed with error: {e}")
-            traceback.print_exc()
-            return
+            logger.info(f"[OK] {name} Report completed successfully")
         
         # Save final output
-        print(f"\n[SAVE] Saving final combined file...")
-        # Use input file name as base for output file name
-        input_filename = file_c1_c6.stem  # Get filename without extension
-        output_file = out_folder / f"{input_filename}.xlsx"
-        wb_c1_c6.save(output_file)
+        logger.info(f"\n[SAVE] Saving final combined file...")
+        log_handler.flush()
+        wb_c1_c6.save(partial_file)
+        os.replace(partial_file, output_file)
         
-        print(f"\n[SUCCESS] All reports completed successfully!")
-        print(f"[SAVE] Final combined file saved to: {output_file}")
-        print(f"[PROCESS] Contains all modifications from scripts C2 through C6")
+        logger.info(f"\n[SUCCESS] All reports completed successfully!")
+        logger.info(f"[SAVE] Final combined file saved to: {output_file}")
+        logger.info(f"[PROCESS] Contains all modifications from scripts C2 through C6")
         
     except FileNotFoundError as e:
-        print(f"[ERROR] File not found: {e}")
+        logger.error(f"[ERROR] File not found: {e}")
     except PermissionError as e:
-        print(f"[ERROR] Permission error (file might be open in Excel): {e}")
+        logger.error(f"[ERROR] Permission error (file might be open in Excel): {e}")
     except Exception as e:
-        print(f"[ERROR] An unexpected error occurred: {e}")
-        traceback.print_exc()
+        logger.exception(f"[ERROR] An unexpected error occurred: {e}")
+    finally:
+        # Read-only workbooks keep the source file open until closed
+        if wb_afl is not None:
+            wb_afl.close()
+        # Remove the working copy left behind by a failed run
+        try:
+            partial_file.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"[WARN] Could not remove working copy {partial_file}: {e}")
+        log_handler.flush()
 
 if __name__ == "__main__":
     main()
@@ -4,14 +4,42 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.keys import Keys
 import time
 import os
+import glob
+import functools
+import logging
+import threading
 from dotenv import load_dotenv
 from cryptography.fernet import Fernet
 
+# watchdog is optional: without it downloads are detected by polling the folder
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    WATCHDOG_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+@functools.lru_cache(maxsize=1)
+def _get_fernet(key_str):
+    """Fernet instance for key_str, built once and reused while the key is unchanged"""
+    return Fernet(key_str.encode())
+
+ERP_URL = "https://erp.assetline.lk"
+FINANCE_URL = "https://erp.assetline.lk/Application/Home/FINANCE"
+
 class ERPLoginBot:
-    def __init__(self, download_folder=None):
+    def __init__(self, download_folder=None, debugger_address=None):
+        """
+        Args:
+            download_folder (str): Folder the TB report is downloaded to
+            debugger_address (str): "host:port" of a Chrome started with
+                --remote-debugging-port and its own --user-data-dir. When set, the bot
+                attaches to that browser and skips login if its session is still valid.
+        """
         # Set download folder
         if download_folder is None:
             download_folder = os.path.join(os.getcwd(), "downloads")
@@ -19,28 +47,34 @@ class ERPLoginBot:
         # Create download folder if it doesn't exist
         os.makedirs(download_folder, exist_ok=True)
         self.download_folder = os.path.abspath(download_folder)
+        self.debugger_address = debugger_address
         
         # Configure Chrome options
         self.chrome_options = Options()
-        # Uncomment the next line to run headless (without opening browser window)
-        # self.chrome_options.add_argument("--headless")
-        self.chrome_options.add_argument("--no-sandbox")
-        self.chrome_options.add_argument("--disable-dev-shm-usage")
-        self.chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        self.chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        self.chrome_options.add_experimental_option('useAutomationExtension', False)
-        
-        # Set download preferences
-        prefs = {
-            "download.default_directory": self.download_folder,
-            "download.prompt_for_download": False,
-            "download.directory_upgrade": True,
-            "safebrowsing.enabled": True
-        }
-        self.chrome_options.add_experimental_option("prefs", prefs)
+        if debugger_address:
+            # Launch-only options are rejected by chromedriver when attaching to a
+            # running browser; the download folder is set over CDP in start_driver
+            self.chrome_options.add_experimental_option("debuggerAddress", debugger_address)
+        else:
+            # Uncomment the next line to run headless (without opening browser window)
+            # self.chrome_options.add_argument("--headless")
+            self.chrome_options.add_argument("--no-sandbox")
+            self.chrome_options.add_argument("--disable-dev-shm-usage")
+            self.chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+            self.chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+            self.chrome_options.add_experimental_option('useAutomationExtension', False)
+            
+            # Set download preferences
+            prefs = {
+                "download.default_directory": self.download_folder,
+                "download.prompt_for_download": False,
+                "download.directory_upgrade": True,
+                "safebrowsing.enabled": True
+            }
+            self.chrome_options.add_experimental_option("prefs", prefs)
         
         self.driver = None
-        print(f"Download folder set to: {self.download_folder}")
+        logger.info(f"Download folder set to: {self.download_folder}")
         
     def decrypt_credentials(self, enc_username, enc_password):
         """
@@ -52,7 +86,7 @@ class ERPLoginBot:
             if not enc_username or not enc_password:
                 raise ValueError("ENC_USERNAME and ENC_PASSWORD must be set in environment variables")
             
-            print("Found encrypted credentials, attempting to decrypt...")
+            logger.info("Found encrypted credentials, attempting to decrypt...")
 
             # Use inline key first; fall back to ENCRYPTION_KEY env var. No .key file is used.
             key_str = ENCRYPTION_KEY_INLINE.strip() if ENCRYPTION_KEY_INLINE else ""
@@ -61,61 +95,86 @@ class ERPLoginBot:
             if not key_str:
                 raise ValueError("Missing ENCRYPTION_KEY_INLINE and ENCRYPTION_KEY environment variable")
 
-            key = key_str.encode()
-            fernet = Fernet(key)
+            fernet = _get_fernet(key_str)
             
             # Decrypt credentials
             username = fernet.decrypt(enc_username.encode()).decode()
             password = fernet.decrypt(enc_password.encode()).decode()
             
-            print("Successfully decrypted credentials")
+            logger.info("Successfully decrypted credentials")
             return username, password
             
         except Exception as e:
-            print(f"Failed to decrypt credentials: {e}")
+            logger.error(f"Failed to decrypt credentials: {e}")
             raise
         
+    def start_driver(self):
+        """
+        Start Chrome, or attach to the running browser when debugger_address is set
+        """
+        if self.driver is None:
+            self.driver = webdriver.Chrome(options=self.chrome_options)
+            if self.debugger_address:
+                # Download prefs only apply at browser launch
+                self.driver.execute_cdp_cmd("Page.setDownloadBehavior", {
+                    "behavior": "allow",
+                    "downloadPath": self.download_folder
+                })
+            self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        return self.driver
+    
+    def is_logged_in(self):
+        """
+        Open the Finance page and check that it loads instead of the login form
+        """
+        try:
+            self.driver.get(FINANCE_URL)
+            WebDriverWait(self.driver, 5).until(
+                lambda driver: driver.find_elements(By.ID, "iddivAppContent") or driver.find_elements(By.ID, "strUserName"))
+            return not self.driver.find_elements(By.ID, "strUserName")
+        except Exception:
+            return False
+        
     def login_to_erp(self, username, password):
         """
         Login to ERP system
         """
         try:
             # Initialize Chrome driver
-            self.driver = webdriver.Chrome(options=self.chrome_options)
-            self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+            self.start_driver()
             
             # Navigate to ERP site
-            print("Opening ERP website...")
-            self.driver.get("https://erp.assetline.lk")
+            logger.info("Opening ERP website...")
+            self.driver.get(ERP_URL)
             
             # Wait for page to load
             wait = WebDriverWait(self.driver, 15)
             
             # Wait for username field and enter username
-            print("Entering username...")
-            username_field = wait.until(EC.presence_of_element_located((By.XPATH, '//*[@id="strUserName"]')))
+            logger.info("Entering username...")
+            username_field = wait.until(EC.presence_of_element_located((By.ID, "strUserName")))
             username_field.clear()
             username_field.send_keys(username)
             
             # Enter password
-            print("Entering password...")
-            password_field = self.driver.find_element(By.XPATH, '//*[@id="strPassword"]')
+            logger.info("Entering password...")
+            password_field = self.driver.find_element(By.ID, "strPassword")
             password_field.clear()
             password_field.send_keys(password)
             
             # Click sign in button
-            print("Clicking sign in...")
-            sign_in_button = self.driver.find_element(By.XPATH, '//*[@id="idSignIn"]')
+            logger.info("Clicking sign in...")
+            sign_in_button = self.driver.find_element(By.ID, "idSignIn")
             sign_in_button.click()
             
-            # Wait for login to complete
-            time.sleep(3)
+            # Wait for login to complete (the sign-in page is replaced)
+            wait.until(EC.staleness_of(sign_in_button))
             
-            print("Login successful!")
+            logger.info("Login successful!")
             return True
                 
         except Exception as e:
-            print(f"Error during login: {str(e)}")
+            logger.error(f"Error during login: {str(e)}")
             return False
     
     def select_premises(self):
@@ -125,99 +184,170 @@ class ERPLoginBot:
         try:
             wait = WebDriverWait(self.driver, 20)
             
-            # Wait a bit for the page/modal to load
-            time.sleep(3)
-            
-            # Just click the Select button directly
-            print("Clicking Select button...")
-            select_button = wait.until(EC.element_to_be_clickable((By.XPATH, '/html/body/div[2]/div[3]/form/div/button')))
+            # Just click the Select button directly (waits for the page/modal to load)
+            logger.info("Clicking Select button...")
+            select_button = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, 'body > div:nth-of-type(2) > div:nth-of-type(3) > form > div > button')))
             select_button.click()
             
             # Wait for page to load after selection
-            time.sleep(3)
+            wait.until(EC.staleness_of(select_button))
             
             # Refresh the page
-            print("Refreshing the page...")
+            logger.info("Refreshing the page...")
             self.driver.refresh()
             
             # Wait for page to fully reload
-            print("Waiting for page to fully reload...")
-            time.sleep(3)
+            logger.info("Waiting for page to fully reload...")
+            wait.until(lambda driver: driver.execute_script("return document.readyState") == "complete")
             
-            print("Premises selection completed!")
+            logger.info("Premises selection completed!")
             return True
             
         except Exception as e:
-            print(f"Error clicking Select button: {str(e)}")
+            logger.error(f"Error clicking Select button: {str(e)}")
             return False
     
-    def wait_for_download_completion(self, timeout=500):
+    def _wait_for_report_event(self, existing_files, timeout):
+        """
+        Block until a new TB-COA Report file is written to the download folder,
+        using filesystem events instead of polling.
+
+        Args:
+            existing_files (set): File names present before the download started
+            timeout (int): Maximum time to wait in seconds
+
+        Returns:
+            str: Path of the downloaded file, or None on timeout
+        """
+        download_folder = self.download_folder
+
+        class ReportDownloadHandler(FileSystemEventHandler):
+            def __init__(self):
+                self.done = threading.Event()
+                self.file_path = None
+
+            def check(self, path):
+                filename = os.path.basename(path)
+                if filename in existing_files or 'Report' not in filename or not filename.endswith('.xlsx'):
+                    return
+                # Chrome writes to a .crdownload file and renames it when complete;
+                # ignore empty placeholders created before any data is written
+                try:
+                    if os.path.getsize(path) == 0:
+                        return
+                except OSError:
+                    return
+                self.file_path = path
+                self.done.set()
+
+            def on_created(self, event):
+                if not event.is_directory:
+                    self.check(event.src_path)
+
+            def on_modified(self, event):
+                if not event.is_directory:
+                    self.check(event.src_path)
+
+            def on_moved(self, event):
+                if not event.is_directory:
+                    self.check(event.dest_path)
+
+        handler = ReportDownloadHandler()
+        observer = Observer()
+        observer.schedule(handler, download_folder, recursive=False)
+        observer.start()
+        try:
+            # The download may have finished before the observer started
+            for filename in set(os.listdir(download_folder)) - existing_files:
+                handler.check(os.path.join(download_folder, filename))
+            handler.done.wait(timeout)
+        finally:
+            observer.stop()
+            observer.join()
+        return handler.file_path
+
+    def snapshot_download_folder(self):
+        """
+        Names of the files currently in the download folder
+        """
+        with os.scandir(self.download_folder) as entries:
+            return {entry.name for entry in entries}
+
+    def wait_for_download_completion(self, timeout=500, existing_files=None):
         """
         Wait for TB-COA file to be downloaded
         Looks for files matching pattern: YYYY_MM_DD_HH_MM_Report.xlsx
 
         Args:
             timeout (int): Maximum time to wait in seconds (default: 120)
+            existing_files (set): Folder contents from snapshot_download_folder() taken
+                before the download was started; taken now if not given
 
         Returns:
             bool: True if file downloaded, False if timeout
         """
         try:
-            print(f"Monitoring download folder: {self.download_folder}")
-            print("Looking for TB-COA Report file (pattern: YYYY_MM_DD_HH_MM_Report.xlsx)...")
+            logger.info(f"Monitoring download folder: {self.download_folder}")
+            logger.info("Looking for TB-COA Report file (pattern: YYYY_MM_DD_HH_MM_Report.xlsx)...")
 
             # Get list of existing files before download
-            existing_files = set(os.listdir(self.download_folder))
+            if existing_files is None:
+                existing_files = self.snapshot_download_folder()
 
             start_time = time.time()
-            check_interval = 1  # Check every 1 second
-
-            while time.time() - start_time < timeout:
-                # Get current files in download folder
-                current_files = set(os.listdir(self.download_folder))
-
-                # Find new files
-                new_files = current_files - existing_files
-
-                for filename in new_files:
-                    # Check if it matches TB-COA report pattern
-                    # Pattern: YYYY_MM_DD_HH_MM_Report.xlsx or similar
-                    if 'Report' in filename and filename.endswith('.xlsx'):
-                        # Check if file is not a temporary download file
-                        if not filename.endswith('.tmp') and not filename.endswith('.crdownload'):
-                            file_path = os.path.join(self.download_folder, filename)
-
-                            # Check if file is fully downloaded (size is stable)
-                            try:
-                                size1 = os.path.getsize(file_path)
-                                time.sleep(1)
-                                size2 = os.path.getsize(file_path)
-
-                                if size1 == size2 and size1 > 0:
-                                    print(f"✓ Downloaded: {filename}")
-                                    print(f"  File size: {size1:,} bytes")
-                                    print(f"  Location: {file_path}")
-                                    return True
-                            except:
-                                # File might still be downloading
-                                pass
-
-                # Show progress indicator
-                elapsed = int(time.time() - start_time)
-                if elapsed % 5 == 0:  # Print every 5 seconds
-                    print(f"  Waiting... ({elapsed}s / {timeout}s)")
-
-                time.sleep(check_interval)
+
+            if WATCHDOG_AVAILABLE:
+                file_path = self._wait_for_report_event(existing_files, timeout)
+                if file_path:
+                    logger.info(f"✓ Downloaded: {os.path.basename(file_path)}")
+                    logger.info(f"  File size: {os.path.getsize(file_path):,} bytes")
+                    logger.info(f"  Location: {file_path}")
+                    return True
+            else:
+                check_interval = 1  # Check every 1 second
+                last_logged = 0
+                # Only TB-COA report files (YYYY_MM_DD_HH_MM_Report.xlsx or similar); temporary
+                # .tmp/.crdownload files never match the .xlsx suffix
+                report_pattern = os.path.join(glob.escape(self.download_folder), '*Report*.xlsx')
+
+                while time.time() - start_time < timeout:
+                    for file_path in glob.iglob(report_pattern):
+                        filename = os.path.basename(file_path)
+                        if filename in existing_files:
+                            continue
+
+                        # Check if file is fully downloaded (size is stable)
+                        try:
+                            size1 = os.path.getsize(file_path)
+                            time.sleep(1)
+                            size2 = os.path.getsize(file_path)
+
+                            if size1 == size2 and size1 > 0:
+                                logger.info(f"✓ Downloaded: {filename}")
+                                logger.info(f"  File size: {size1:,} bytes")
+                                logger.info(f"  Location: {file_path}")
+                                return True
+                        except:
+                            # File might still be downloading
+                            pass
+
+                    # Show progress indicator every 5 seconds (the loop tick is not exactly 1s)
+                    elapsed = int(time.time() - start_time)
+                    if elapsed - last_logged >= 5:
+                        logger.info("  Waiting... (%ds / %ds)", elapsed, timeout)
+                        last_logged = elapsed
+
+                    time.sleep(check_interval)
 
             # Timeout reached
             elapsed = int(time.time() - start_time)
-            print(f"✗ Timeout reached after {elapsed} seconds")
-            print(f"  No TB-COA Report file detected in: {self.download_folder}")
+            logger.warning(f"✗ Timeout reached after {elapsed} seconds")
+            logger.info(f"  No TB-COA Report file detected in: {self.download_folder}")
 
             return False
 
         except Exception as e:
-            print(f"Error waiting for download: {str(e)}")
+            logger.error(f"Error waiting for download: {str(e)}")
             return False
 
     def navigate_to_tb_report(self):
@@ -228,30 +358,27 @@ class ERPLoginBot:
             wait = WebDriverWait(self.driver, 15)
             
             # Navigate directly to Finance page
-            print("Navigating to Finance page...")
-            self.driver.get("https://erp.assetline.lk/Application/Home/FINANCE")
+            logger.info("Navigating to Finance page...")
+            self.driver.get(FINANCE_URL)
             
-            # Wait for Finance page to load
-            print("Waiting for Finance page to load...")
-            time.sleep(5)
-            
-            # Step 6: Navigate to specific section
-            print("Navigating to Management Account section...")
-            section = wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="iddivAppContent"]/div[1]/div/div[1]/div[2]/div/div[1]/div')))
+            # Step 6: Navigate to specific section (waits for the Finance page to load)
+            logger.info("Navigating to Management Account section...")
+            section = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, '#iddivAppContent > div:nth-of-type(1) > div > div:nth-of-type(1) > div:nth-of-type(2) > div > div:nth-of-type(1) > div')))
             section.click()
-            time.sleep(2)
             
-            # Step 7: Select TB-COA inquiry
-            print("Opening TB-COA inquiry...")
-            tb_inquiry = wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="btn_03832_Inquiry"]')))
+            # Step 7: Select TB-COA inquiry (waits for the section to open)
+            logger.info("Opening TB-COA inquiry...")
+            tb_inquiry = wait.until(EC.element_to_be_clickable((By.ID, "btn_03832_Inquiry")))
             tb_inquiry.click()
-            time.sleep(2)
             
-            print("Successfully navigated to TB-COA report!")
+            # Wait for the TB-COA inquiry form to open
+            wait.until(EC.presence_of_element_located((By.ID, "plt_03832_Main")))
+            
+            logger.info("Successfully navigated to TB-COA report!")
             return True
             
         except Exception as e:
-            print(f"Error navigating to TB report: {str(e)}")
+            logger.error(f"Error navigating to TB report: {str(e)}")
             return False
     
     def generate_tb_report(self, report_date="28/09/2025"):
@@ -264,10 +391,10 @@ class ERPLoginBot:
             wait = WebDriverWait(self.driver, 15)
 
             # Step 8: Select date field and enter date using the correct XPath
-            print(f"Entering report date: {report_date}...")
+            logger.info(f"Entering report date: {report_date}...")
 
             # Wait for the date input container to be present
-            date_container = wait.until(EC.presence_of_element_located((By.XPATH, '//*[@id="plt_03832_Main"]/div[8]/div[2]/div/div')))
+            date_container = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, '#plt_03832_Main > div:nth-of-type(8) > div:nth-of-type(2) > div > div')))
 
             # Try to find the actual input field within the container
             # It could be a direct input or nested within the div
@@ -278,66 +405,47 @@ class ERPLoginBot:
                 # If no input found, use the container itself
                 date_field = date_container
 
-            print(f"Found date field, entering date: {report_date}")
-
-            # Click the field to focus it
-            date_field.click()
-            time.sleep(1)
-
-            # Clear any existing value
-            try:
-                date_field.clear()
-                time.sleep(0.5)
-            except:
-                # If clear doesn't work, try selecting all and deleting
-                date_field.send_keys(Keys.CONTROL + "a")
-                time.sleep(0.3)
-                date_field.send_keys(Keys.DELETE)
-                time.sleep(0.5)
-
-            # Enter the date
-            date_field.send_keys(report_date)
-            time.sleep(1)
-
-            # Press Enter or Tab to confirm
-            date_field.send_keys(Keys.TAB)
-            time.sleep(0.5)
-
-            # Also try using JavaScript to set the value as backup
-            try:
-                self.driver.execute_script(f"arguments[0].value = '{report_date}';", date_field)
-                self.driver.execute_script("arguments[0].dispatchEvent(new Event('change', { bubbles: true }));", date_field)
-                self.driver.execute_script("arguments[0].dispatchEvent(new Event('input', { bubbles: true }));", date_field)
-            except:
-                print("JavaScript backup method skipped")
-
-            print(f"✓ Date {report_date} entered successfully")
-            time.sleep(2)
-            
-            # Step 9: Click download button
-            print("Clicking Generate Report button...")
-            download_button = wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="btn_03832_DownloadExcelReport_FINTB_COA"]')))
+            logger.info(f"Found date field, entering date: {report_date}")
+
+            # Set the value and fire the events the page listens for in one call,
+            # instead of click/clear/type/TAB round-trips with pauses in between
+            self.driver.execute_script(
+                "const el = arguments[0];"
+                "el.focus();"
+                "el.value = arguments[1];"
+                "el.dispatchEvent(new Event('input', { bubbles: true }));"
+                "el.dispatchEvent(new Event('change', { bubbles: true }));"
+                "el.blur();",
+                date_field, report_date)
+            wait.until(lambda driver: date_field.get_attribute('value') == report_date)
+
+            logger.info(f"✓ Date {report_date} entered successfully")
+            
+            # Step 9: Click download button (waits until it can be clicked)
+            logger.info("Clicking Generate Report button...")
+            download_button = wait.until(EC.element_to_be_clickable((By.ID, "btn_03832_DownloadExcelReport_FINTB_COA")))
+            # Snapshot before clicking so a download that starts at once is still seen as new
+            existing_files = self.snapshot_download_folder()
             download_button.click()
 
-            print("\n" + "="*60)
-            print("Report download initiated!")
-            print("Waiting for file to be downloaded...")
-            print("="*60 + "\n")
+            logger.info("\n" + "="*60)
+            logger.info("Report download initiated!")
+            logger.info("Waiting for file to be downloaded...")
+            logger.info("="*60 + "\n")
 
             # Wait for the TB-COA file to appear in the download folder
-            downloaded = self.wait_for_download_completion()
+            downloaded = self.wait_for_download_completion(existing_files=existing_files)
 
             if downloaded:
-                print("✓ TB-COA file downloaded successfully!")
-                print("Closing browser...")
-                time.sleep(2)  # Small delay before closing
+                logger.info("✓ TB-COA file downloaded successfully!")
+                logger.info("Closing browser...")
                 return True
             else:
-                print("✗ Download timeout - file not detected")
+                logger.warning("✗ Download timeout - file not detected")
                 return False
             
         except Exception as e:
-            print(f"Error generating TB report: {str(e)}")
+            logger.error(f"Error generating TB report: {str(e)}")
             return False
     
     def run_full_automation(self, enc_username, enc_password, report_date="28/09/2025"):
@@ -348,33 +456,37 @@ class ERPLoginBot:
             # Step 1: Decrypt credentials
             username, password = self.decrypt_credentials(enc_username, enc_password)
             
-            # Step 2: Login
-            if not self.login_to_erp(username, password):
-                print("Login failed!")
-                return False
-            
-            # Step 3: Click Select button only
-            if not self.select_premises():
-                print("Premises selection failed!")
-                return False
+            # Reuse the attached browser's session when it is still logged in
+            if self.debugger_address and self.start_driver() and self.is_logged_in():
+                logger.info("Reusing logged-in browser session, skipping login")
+            else:
+                # Step 2: Login
+                if not self.login_to_erp(username, password):
+                    logger.error("Login failed!")
+                    return False
+                
+                # Step 3: Click Select button only
+                if not self.select_premises():
+                    logger.error("Premises selection failed!")
+                    return False
             
             # Step 4: Navigate to TB report
             if not self.navigate_to_tb_report():
-                print("Navigation to TB report failed!")
+                logger.error("Navigation to TB report failed!")
                 return False
             
             # Step 5: Generate and download report
             if not self.generate_tb_report(report_date):
-                print("Report generation failed!")
+                logger.error("Report generation failed!")
                 return False
             
-            print("\n" + "="*60)
-            print("SUCCESS: TB Report automation completed!")
-            print("="*60)
+            logger.info("\n" + "="*60)
+            logger.info("SUCCESS: TB Report automation completed!")
+            logger.info("="*60)
             return True
             
         except Exception as e:
-            print(f"Error in automation workflow: {str(e)}")
+            logger.error(f"Error in automation workflow: {str(e)}")
             return False
             
     def close_browser(self):
@@ -383,18 +495,21 @@ class ERPLoginBot:
         """
         if self.driver:
             try:
-                print("Closing browser...")
+                logger.info("Closing browser...")
                 self.driver.quit()
             except:
                 pass
 
 def main():
+    # Show the bot's progress when run directly (no-op if logging is already configured)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    
     # Load environment variables from .env file in parent directory
     env_path = os.path.join(os.path.dirname(__file__), '..', '.env')
     load_dotenv(dotenv_path=env_path)
     
     # Debug: Print if .env file was found
-    print(f"Looking for .env file at: {os.path.abspath(env_path)}")
+    logger.info(f"Looking for .env file at: {os.path.abspath(env_path)}")
     
     # Get encrypted credentials from environment variables
     ENC_USERNAME = os.getenv('ENC_USERNAME')
@@ -402,34 +517,38 @@ def main():
     
     # Debug: Check if credentials were loaded
     if ENC_USERNAME:
-        print(f"ENC_USERNAME loaded: {ENC_USERNAME[:20]}...")
+        logger.info(f"ENC_USERNAME loaded: {ENC_USERNAME[:20]}...")
     else:
-        print("WARNING: ENC_USERNAME not found in environment variables")
+        logger.warning("WARNING: ENC_USERNAME not found in environment variables")
     
     if ENC_PASSWORD:
-        print(f"ENC_PASSWORD loaded: {ENC_PASSWORD[:20]}...")
+        logger.info(f"ENC_PASSWORD loaded: {ENC_PASSWORD[:20]}...")
     else:
-        print("WARNING: ENC_PASSWORD not found in environment variables")
+        logger.warning("WARNING: ENC_PASSWORD not found in environment variables")
     
     REPORT_DATE = "28/09/2025"  # DD/MM/YYYY format
     
     # Set download folder to the project's Input folder
     DOWNLOAD_FOLDER = r"C:\CBSL\Script\working\weekly\07-06-2025\NBD_MF_04_LA\Input"
     
+    # Optional persistent Chrome to attach to, e.g. started with
+    # chrome --remote-debugging-port=9222 --user-data-dir=C:\CBSL\chrome_profile
+    CHROME_DEBUGGER_ADDRESS = os.getenv('CHROME_DEBUGGER_ADDRESS')  # e.g. "127.0.0.1:9222"
+    
     # Create bot instance
-    bot = ERPLoginBot(download_folder=DOWNLOAD_FOLDER)
+    bot = ERPLoginBot(download_folder=DOWNLOAD_FOLDER, debugger_address=CHROME_DEBUGGER_ADDRESS)
     
     try:
         # Run full automation with encrypted credentials
         success = bot.run_full_automation(ENC_USERNAME, ENC_PASSWORD, REPORT_DATE)
         
         if success:
-            print("\nERP TB report automation completed successfully!")
+            logger.info("\nERP TB report automation completed successfully!")
         else:
-            print("\nERP TB report automation failed!")
+            logger.error("\nERP TB report automation failed!")
             
     except Exception as e:
-        print(f"Script error: {str(e)}")
+        logger.error(f"Script error: {str(e)}")
         
     finally:
         # Always close browser (if not already closed)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Check that mt_report_consolidator.read_unmerged_sheet names its columns the way
+pd.read_excel does, including headers merged across several columns.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+from openpyxl import Workbook
+
+# Add the current directory to path to import the consolidator
+sys.path.append(str(Path(__file__).parent))
+
+from mt_report_consolidator import read_unmerged_sheet
+
+
+def write_report(path):
+    """Write a small Client Available Limits style report with merged cells"""
+    wb = Workbook()
+    ws = wb.active
+    ws['A1'] = "Client Available Limits Report"
+    ws.merge_cells('A1:D1')
+    ws.append([])
+    ws.append(["MT No.", "Client Name", "Actual Lending(Rs.)", None])
+    # The Actual Lending header spans two columns
+    ws.merge_cells('C3:D3')
+    ws.append(["MT001", "Client A", 1000, 50])
+    ws.append(["MT002", "Client B", 2000, 75])
+    ws.append(["MT003", "Client C", 3000, None])
+    # A client listed across two rows
+    ws.merge_cells('B5:B6')
+    wb.save(path)
+
+
+def test_read_unmerged_sheet_dedupes_merged_header():
+    """A header merged sideways gives "name" and "name.1" columns, as pd.read_excel would name them"""
+    with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as f:
+        path = f.name
+    try:
+        write_report(path)
+        df = read_unmerged_sheet(path, skiprows=1)
+    finally:
+        os.remove(path)
+
+    assert df.columns.tolist() == ["MT No.", "Client Name", "Actual Lending(Rs.)", "Actual Lending(Rs.).1"]
+    assert df[['MT No.', 'Client Name', 'Actual Lending(Rs.)']].shape == (3, 3)
+    assert df['Client Name'].tolist() == ["Client A", "Client B", "Client B"]
+    assert df['Actual Lending(Rs.)'].tolist() == [1000, 2000, 3000]
+
+
+if __name__ == "__main__":
+    try:
+        test_read_unmerged_sheet_dedupes_merged_header()
+        print("read_unmerged_sheet column names match pd.read_excel")
+    except AssertionError as e:
+        print(f"\nCheck failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Check that xlsb_reader.read_xlsb_columns returns the same frame as
+pd.read_excel(..., engine='pyxlsb') for the same sheet.
+
+pyxlsb can only read .xlsb files, so the workbook is faked: both readers get the
+same in-memory rows through a patched pyxlsb.open_workbook.
+"""
+
+import os
+import sys
+import tempfile
+from collections import namedtuple
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+
+# Add the current directory to path to import the reader
+sys.path.append(str(Path(__file__).parent))
+
+import xlsb_reader
+from xlsb_reader import read_xlsb_columns
+
+Cell = namedtuple('Cell', ['r', 'c', 'v'])
+
+SHEET_ROWS = [
+    ["Portfolio report", None, None, None, None],
+    ["CONTRACT NO", "CLIENT NO", "Initial Valuation", "STATUS", "CLIENT CODE"],
+    ["C001", 10.0, 1500.5, "Active", "20"],
+    ["NA", 11.0, "N/A", "#N/A", "21"],
+    ["C003", 12.0, None, "NULL", 22.0],
+    [None, None, None, None, None],
+    ["C004", "", 2000.0, "n/a", 23.0],
+    ["C005", 14.0, 2500.0, "Closed", "24"],
+]
+
+
+class FakeSheet:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def rows(self, sparse=False):
+        for r, values in enumerate(self._rows):
+            # pyxlsb's sparse mode leaves out rows with no cells at all
+            if all(v is None for v in values):
+                continue
+            yield [Cell(r, c, v) for c, v in enumerate(values)]
+
+
+class FakeWorkbook:
+    sheets = ['Portfolio']
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def get_sheet(self, name):
+        return FakeSheet(SHEET_ROWS)
+
+    def close(self):
+        pass
+
+
+def fake_open_workbook(*args, **kwargs):
+    return FakeWorkbook()
+
+
+def test_read_xlsb_columns_matches_read_excel():
+    """
+    NA strings and empty cells must come back as NaN and numbers stored as text as numbers,
+    exactly as pd.read_excel returns them
+    """
+    # pd.read_excel opens the path itself before handing it to pyxlsb
+    with tempfile.NamedTemporaryFile(suffix='.xlsb', delete=False) as f:
+        path = f.name
+    try:
+        with mock.patch('pyxlsb.open_workbook', fake_open_workbook), \
+                mock.patch.object(xlsb_reader, 'open_workbook', fake_open_workbook):
+            expected = pd.read_excel(path, sheet_name='Portfolio', skiprows=1, engine='pyxlsb')
+            result = read_xlsb_columns(path, 'Portfolio', skiprows=1)
+            subset = read_xlsb_columns(path, 'Portfolio', skiprows=1,
+                                       keep_cols=['CONTRACT NO', 'Initial Valuation'])
+    finally:
+        os.remove(path)
+
+    pd.testing.assert_frame_equal(result, expected)
+    pd.testing.assert_frame_equal(subset, expected[['CONTRACT NO', 'Initial Valuation']])
+
+
+if __name__ == "__main__":
+    try:
+        test_read_xlsb_columns_matches_read_excel()
+        print("read_xlsb_columns matches pd.read_excel")
+    except AssertionError as e:
+        print(f"\nCheck failed: {e}")
+        sys.exit(1)
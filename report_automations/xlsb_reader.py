@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+from pyxlsb import open_workbook
+
+# Text cells pandas' Excel readers turn into NaN by default (pandas' default na_values)
+XLSB_NA_VALUES = frozenset({
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+})
+
+
+def _xlsb_cell_value(value):
+    """Convert a pyxlsb cell value the same way pandas' pyxlsb reader does"""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _infer_numeric(values):
+    """
+    Convert a column to numbers when every non-NA value converts, as pandas' readers do
+    for numbers stored as text ("20" next to 22); otherwise return it unchanged.
+    """
+    try:
+        return pd.to_numeric(pd.Series(values, dtype=object))
+    except (ValueError, TypeError):
+        return values
+
+
+def read_xlsb_columns(path, sheet_name, skiprows=0, keep_cols=None):
+    """
+    Read a sheet of an .xlsb workbook in a single pyxlsb streaming pass.
+
+    Equivalent to pd.read_excel(path, sheet_name=sheet_name, skiprows=skiprows, engine='pyxlsb'),
+    except that only the columns named in keep_cols are materialised (all columns when None).
+    keep_cols may also be a callable that takes the header names and returns the names to keep.
+    As with pd.read_excel, blank rows between data rows come back as all-NaN rows, empty
+    cells and pandas' default NA strings become NaN, and columns whose values are all
+    numbers (some stored as text) become numeric. The one difference: blank rows before
+    the header are skipped (pd.read_excel would read the first one as an all-"Unnamed" header).
+    """
+    header = None
+    last_row = None
+    keep_idx = []
+    columns = {}
+    with open_workbook(path) as wb:
+        with wb.get_sheet(sheet_name) as sheet:
+            for row in sheet.rows(sparse=True):
+                if not row or row[0].r < skiprows:
+                    continue
+                values = [cell.v for cell in row]
+                if all(v is None or v == '' for v in values):
+                    continue
+
+                if header is None:
+                    # Name the header cells as pandas does: blanks become "Unnamed: i", repeats get ".n"
+                    header = []
+                    seen = {}
+                    for i, name in enumerate(values):
+                        name = f"Unnamed: {i}" if name is None or name == '' else _xlsb_cell_value(name)
+                        if name in seen:
+                            seen[name] += 1
+                            name = f"{name}.{seen[name]}"
+                        else:
+                            seen[name] = 0
+                        header.append(name)
+                    if keep_cols is None:
+                        wanted = set(header)
+                    elif callable(keep_cols):
+                        wanted = set(keep_cols(header))
+                    else:
+                        wanted = set(keep_cols)
+                    keep_idx = [i for i, name in enumerate(header) if name in wanted]
+                    columns = {header[i]: [] for i in keep_idx}
+                    last_row = row[0].r
+                    continue
+
+                # Rows pyxlsb left out (or that held only empty cells) since the last data row
+                for i in keep_idx:
+                    columns[header[i]].extend([np.nan] * (row[0].r - last_row - 1))
+                last_row = row[0].r
+
+                for i in keep_idx:
+                    value = values[i] if i < len(values) else None
+                    if value is None or (isinstance(value, str) and value in XLSB_NA_VALUES):
+                        columns[header[i]].append(np.nan)
+                    else:
+                        columns[header[i]].append(_xlsb_cell_value(value))
+
+    return pd.DataFrame({name: _infer_numeric(values) for name, values in columns.items()})
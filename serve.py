@@ -1,8 +1,12 @@
 from waitress import serve
 from app import app, ensure_directories_exist, kill_excel_instances
 
+# Report runs execute in a background thread, but the UI keeps polling /status,
+# /logs and /status-feed while they run; the default of 4 threads queues those requests
+WAITRESS_THREADS = 16
+
 if __name__ == "__main__":
     kill_excel_instances()
     ensure_directories_exist()
     print("Starting Waitress server on http://0.0.0.0:5000")
-    serve(app, host="0.0.0.0", port=5000)
\ No newline at end of file
+    serve(app, host="0.0.0.0", port=5000, threads=WAITRESS_THREADS)